@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+"""
+Shared setup for the standalone test scripts
+"""
+
+import atexit
+import os
+import sys
+from functools import lru_cache
+
+# Directory holding the application modules, resolved once
+_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def bootstrap():
+    """Make the application modules importable, adding their directory to sys.path once"""
+    if _DIR not in sys.path:
+        sys.path.insert(0, _DIR)
+
+@lru_cache(maxsize=1)
+def _shared_root():
+    """Get the hidden Tk root shared by GUI tests, creating it on first use"""
+    import tkinter as tk
+    
+    root = tk.Tk()
+    root.withdraw()  # Hide the window until a test shows it
+    
+    def destroy_root():
+        try:
+            root.destroy()
+        except tk.TclError:
+            pass  # Already destroyed, e.g. the window was closed by the user
+    
+    atexit.register(destroy_root)
+    return root
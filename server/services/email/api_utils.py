@@ -0,0 +1,25 @@
+"""
+Response helpers shared by the Flask API servers
+"""
+
+import time
+from datetime import datetime, timezone
+
+import orjson
+from flask import current_app
+
+_ts_cache = (0, "")  # (epoch second, ISO string), swapped as one tuple
+
+def now_iso() -> str:
+    """Current UTC time as an ISO string, formatted at most once per second"""
+    global _ts_cache
+    second = int(time.time())
+    cached = _ts_cache
+    if cached[0] != second:
+        cached = (second, datetime.fromtimestamp(second, timezone.utc).isoformat())
+        _ts_cache = cached
+    return cached[1]
+
+def ojsonify(obj, status: int = 200):
+    """jsonify replacement that encodes with orjson"""
+    return current_app.response_class(orjson.dumps(obj), status=status, mimetype='application/json')
@@ -347,22 +347,24 @@ class AuthManager:
         try:
             # First load any existing tokens into cache
             stored_tokens = self.token_manager.get_tokens()
-            if stored_tokens and self.token_manager.is_token_valid(stored_tokens):
-                # Try to get fresh token silently
-                accounts = self.app.get_accounts()
-                if accounts:
-                    result = self.app.acquire_token_silent(
-                        scopes=SCOPES,
-                        account=accounts[0]
-                    )
-                    
-                    if result and 'access_token' in result:
-                        # Store updated tokens
-                        self.token_manager.store_tokens(result)
-                        return result['access_token']
+            if stored_tokens:
+                now = time.time()
+                if self.token_manager.should_refresh(stored_tokens, now):
+                    # Due for refresh (or expired): try to get a fresh token silently
+                    accounts = self.app.get_accounts()
+                    if accounts:
+                        result = self.app.acquire_token_silent(
+                            scopes=SCOPES,
+                            account=accounts[0]
+                        )
+                        
+                        if result and 'access_token' in result:
+                            # Store updated tokens
+                            self.token_manager.store_tokens(result)
+                            return result['access_token']
                 
-                # If silent acquisition failed but token is still valid, use it
-                if self.token_manager.is_token_valid(stored_tokens):
+                # Not due for refresh, or silent refresh failed but token is still valid
+                if self.token_manager.is_token_valid(stored_tokens, now):
                     return stored_tokens.get('access_token')
             
             logger.warning("No valid tokens available, user needs to re-authenticate")
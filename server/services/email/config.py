@@ -39,6 +39,8 @@ GRAPH_BASE_URL = "https://graph.microsoft.com/v1.0"
 MESSAGES_ENDPOINT = f"{GRAPH_BASE_URL}/me/messages"
 FOLDERS_ENDPOINT = f"{GRAPH_BASE_URL}/me/mailFolders"
 USER_ENDPOINT = f"{GRAPH_BASE_URL}/me"
+BATCH_ENDPOINT = f"{GRAPH_BASE_URL}/$batch"
+GRAPH_BATCH_LIMIT = 20  # Max sub-requests per $batch call
 
 # UI Configuration
 WINDOW_WIDTH = 1000
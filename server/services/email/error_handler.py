@@ -3,8 +3,13 @@ Centralized error handling and offline scenario management
 Provides robust error handling for authentication and API failures
 """
 
+import json
 import logging
+import socket
+import sqlite3
+import threading
 import time
+from datetime import datetime
 from typing import Optional, Callable, Any
 from functools import wraps
 import requests
@@ -39,9 +44,12 @@ class ErrorHandler:
     """Centralized error handling and recovery"""
     
     def __init__(self):
-        self.offline_mode = False
+        self.offline_mode = False  # Optimistic until the first probe says otherwise
         self.last_network_check = 0
         self.network_check_interval = 30  # seconds
+        self._probe_thread = None
+        self._probe_lock = threading.Lock()
+        self._stop_probe = None  # Stop event of the running probe thread
         
     def handle_api_error(self, response: requests.Response) -> None:
         """
@@ -114,34 +122,60 @@ class ErrorHandler:
         """
         Check if network connectivity is available
         
+        The actual probe runs periodically on a background thread, so this
+        never blocks the caller on network I/O.
+        
         Returns:
             bool: True if network is available, False otherwise
         """
-        current_time = time.time()
-        
-        # Avoid checking too frequently
-        if current_time - self.last_network_check < self.network_check_interval:
-            return not self.offline_mode
+        if self._probe_thread is None:
+            self.start_network_monitor()
+        return not self.offline_mode
+    
+    def start_network_monitor(self) -> None:
+        """Start the background connectivity probe if it is not running"""
+        with self._probe_lock:
+            if self._probe_thread is not None:
+                return
+            # Each probe thread gets its own stop event, so a restart can't
+            # revive a thread that is still shutting down
+            self._stop_probe = threading.Event()
+            self._probe_thread = threading.Thread(target=self._probe_loop, args=(self._stop_probe,),
+                                                  name="network-probe", daemon=True)
+            self._probe_thread.start()
+    
+    def stop_network_monitor(self) -> None:
+        """Stop the background connectivity probe and wait for it to exit"""
+        with self._probe_lock:
+            probe_thread, self._probe_thread = self._probe_thread, None
+            if self._stop_probe is not None:
+                self._stop_probe.set()
+                self._stop_probe = None
         
-        self.last_network_check = current_time
+        if probe_thread is not None and probe_thread is not threading.current_thread():
+            probe_thread.join()
+    
+    def _probe_loop(self, stop_event: threading.Event) -> None:
+        """Probe connectivity every network_check_interval seconds until stopped"""
+        while not stop_event.is_set():
+            self._probe_network()
+            stop_event.wait(self.network_check_interval)
+    
+    def _probe_network(self) -> bool:
+        """Perform a single connectivity probe and update offline mode"""
+        self.last_network_check = time.time()
         
         try:
-            # Quick connectivity check to Microsoft's login endpoint
-            response = requests.get(
-                'https://login.microsoftonline.com/common/discovery/instance',
-                timeout=5
-            )
+            # A bare TCP connect to Microsoft's login endpoint is enough to tell
+            # whether we are online; no TLS handshake or HTTP request needed
+            with socket.create_connection(('login.microsoftonline.com', 443), timeout=2.0):
+                pass
             
-            if response.status_code == 200:
-                self.offline_mode = False
-                logger.info("Network connectivity confirmed")
-                return True
-            else:
-                self.offline_mode = True
-                logger.warning("Network connectivity check failed")
-                return False
+            self.offline_mode = False
+            logger.info("Network connectivity confirmed")
+            return True
                 
-        except requests.RequestException as e:
+        except OSError as e:
             self.offline_mode = True
             logger.warning(f"Network connectivity check failed: {str(e)}")
             return False
@@ -246,13 +280,44 @@ def safe_api_call(func: Callable,
     
     return default_return
 
+OFFLINE_DB_PATH = "offline.db"
+
+def _received_timestamp(email: dict) -> Optional[int]:
+    """Convert an email's receivedDateTime to epoch seconds for indexing, or None if unparseable"""
+    received = email.get('receivedDateTime')
+    try:
+        # Graph uses a trailing "Z", which fromisoformat only accepts from Python 3.11
+        return int(datetime.fromisoformat(received.replace('Z', '+00:00')).timestamp())
+    except (AttributeError, TypeError, ValueError):
+        logger.warning(f"Unparseable receivedDateTime {received!r} for cached email {email.get('id')}")
+        return None
+
 class OfflineDataManager:
-    """Manages cached data for offline operation"""
+    """Manages cached data for offline operation, persisted in SQLite"""
     
-    def __init__(self):
+    def __init__(self, db_path: str = OFFLINE_DB_PATH):
+        self.db_path = db_path
         self.cached_user_info = None
-        self.cached_emails = []
         self.last_sync_time = None
+        self._conn = None
+        self._lock = threading.Lock()
+    
+    def _get_connection(self) -> sqlite3.Connection:
+        """Open the offline database on first use"""
+        if self._conn is None:
+            conn = sqlite3.connect(self.db_path, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS emails (
+                    id TEXT PRIMARY KEY,
+                    received INTEGER,
+                    payload BLOB
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_emails_received ON emails (received)")
+            self._conn = conn
+        return self._conn
     
     def cache_user_info(self, user_info: dict) -> None:
         """Cache user profile information"""
@@ -260,27 +325,66 @@ class OfflineDataManager:
         logger.info("User info cached for offline use")
     
     def cache_emails(self, emails: list) -> None:
-        """Cache email data for offline browsing"""
-        self.cached_emails = emails
+        """Cache email data for offline browsing, replacing the previous snapshot"""
+        rows = [
+            (email['id'], _received_timestamp(email), json.dumps(email).encode('utf-8'))
+            for email in emails if email.get('id')
+        ]
+        if len(rows) < len(emails):
+            logger.warning(f"Skipped {len(emails) - len(rows)} emails without an id")
+        with self._lock:
+            conn = self._get_connection()
+            conn.execute("BEGIN")
+            try:
+                # Mail deleted or moved since the last sync must not be served offline
+                conn.execute("DELETE FROM emails")
+                conn.executemany(
+                    "INSERT OR REPLACE INTO emails (id, received, payload) VALUES (?, ?, ?)",
+                    rows
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
         self.last_sync_time = time.time()
-        logger.info(f"Cached {len(emails)} emails for offline use")
+        logger.info(f"Cached {len(rows)} emails for offline use")
     
     def get_cached_user_info(self) -> Optional[dict]:
         """Get cached user information"""
         return self.cached_user_info
     
-    def get_cached_emails(self) -> list:
-        """Get cached email data"""
-        return self.cached_emails
+    def get_cached_emails(self, limit: Optional[int] = None, since: Optional[float] = None) -> list:
+        """
+        Get cached email data, newest first
+        
+        Args:
+            limit: Maximum number of emails to return (all if None)
+            since: Only return emails received after this epoch timestamp
+        """
+        # Emails with an unknown received time (NULL) sort last and never match since
+        query = "SELECT payload FROM emails"
+        params = []
+        if since is not None:
+            query += " WHERE received > ?"
+            params.append(int(since))
+        query += " ORDER BY received DESC LIMIT ?"
+        params.append(-1 if limit is None else limit)
+        with self._lock:
+            rows = self._get_connection().execute(query, params).fetchall()
+        return [json.loads(payload) for (payload,) in rows]
     
     def has_cached_data(self) -> bool:
         """Check if cached data is available"""
-        return bool(self.cached_emails or self.cached_user_info)
+        if self.cached_user_info:
+            return True
+        with self._lock:
+            return self._get_connection().execute("SELECT 1 FROM emails LIMIT 1").fetchone() is not None
     
     def clear_cache(self) -> None:
         """Clear all cached data"""
         self.cached_user_info = None
-        self.cached_emails = []
+        with self._lock:
+            self._get_connection().execute("DELETE FROM emails")
         self.last_sync_time = None
         logger.info("Offline cache cleared")
 
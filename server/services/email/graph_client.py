@@ -3,37 +3,225 @@ Microsoft Graph API Client for Email Operations
 Handles all Graph API interactions for reading emails and mailbox data
 """
 
+import asyncio
+import httpx
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import json
 import logging
+import math
+import random
+import threading
 import time
-from typing import List, Dict, Any, Optional
-from datetime import datetime, timedelta
+from email.utils import parsedate_to_datetime
+from typing import List, Dict, Any, Optional, Tuple, Union
+from datetime import datetime, timedelta, timezone
+from types import MappingProxyType
 from dateutil import parser as date_parser
-from config import GRAPH_BASE_URL, MESSAGES_ENDPOINT, FOLDERS_ENDPOINT, USER_ENDPOINT
+from config import GRAPH_BASE_URL, MESSAGES_ENDPOINT, FOLDERS_ENDPOINT, USER_ENDPOINT, BATCH_ENDPOINT, GRAPH_BATCH_LIMIT
 from auth_manager import AuthManager
 
 logger = logging.getLogger(__name__)
 
+# Seconds an access token fetched from the auth manager is reused before re-checking
+TOKEN_CACHE_TTL = 60
+
+# Upper bound and random jitter applied to Retry-After waits on 429 responses
+MAX_RETRY_AFTER = 60
+RETRY_JITTER = 5
+
+# Cap on in-flight Graph requests shared by all clients in the process
+MAX_CONCURRENT_REQUESTS = 10
+_graph_sem = threading.BoundedSemaphore(MAX_CONCURRENT_REQUESTS)
+_checked_out = 0
+_checked_out_lock = threading.Lock()
+
+def requests_in_flight() -> int:
+    """Number of Graph requests currently holding a concurrency slot"""
+    return _checked_out
+
+def _parse_retry_after(value: Union[str, int, float, None]) -> Optional[float]:
+    """
+    Parse a Retry-After value given as delay-seconds or an RFC 7231 HTTP-date
+    
+    Returns:
+        Seconds to wait, or None if the value is missing or unparseable
+    """
+    if value is None or value == '':
+        return None
+    
+    try:
+        seconds = float(value)
+    except ValueError:
+        pass
+    else:
+        # float() accepts "nan" and "inf", which would make the retry wait meaningless
+        return max(seconds, 0) if math.isfinite(seconds) else None
+    
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)  # "-0000" dates are UTC per RFC 7231
+    return max((retry_at - datetime.now(timezone.utc)).total_seconds(), 0)
+
+def _extract_addr(email_obj: Dict[str, Any], _get=dict.get) -> str:
+    """Extract email address from Graph API email object"""
+    if not email_obj:
+        return "Unknown"
+    
+    email_addr = _get(email_obj, 'emailAddress') or {}
+    name = _get(email_addr, 'name')
+    address = _get(email_addr, 'address')
+    return f"{name} <{address}>" if name and address else address or name or "Unknown"
+
 class GraphClient:
     """Client for Microsoft Graph API operations"""
     
+    # Constant query fragments, built once instead of on every call
+    _LIST_SELECT = 'id,subject,from,receivedDateTime,bodyPreview,isRead,hasAttachments,importance'
+    _DETAIL_SELECT = ('id,subject,from,toRecipients,ccRecipients,receivedDateTime,sentDateTime,'
+                      'body,bodyPreview,isRead,hasAttachments,importance,categories')
+    _LIST_PARAMS_BASE = MappingProxyType({
+        '$select': _LIST_SELECT,
+        '$orderby': 'receivedDateTime desc'
+    })
+    _DETAIL_PARAMS = MappingProxyType({'$select': _DETAIL_SELECT})
+    _MESSAGE_LIST_SELECT = _LIST_SELECT + ',conversationId'
+    _MESSAGE_URL_PREFIX = f"{MESSAGES_ENDPOINT}/"
+    _FOLDER_URL_PREFIX = f"{FOLDERS_ENDPOINT}/"
+    
     def __init__(self, auth_manager: AuthManager):
         self.auth_manager = auth_manager
         self.session = requests.Session()
+        # Keep-alive pool sized to the in-flight cap so concurrent callers
+        # (e.g. gunicorn threads) reuse TLS connections instead of reconnecting.
+        # The adapter quickly retries dropped connections on idempotent requests;
+        # 401/429/503 are left to _make_request, which honours Retry-After.
+        retries = Retry(total=3, backoff_factor=0.2, status_forcelist=(), raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=MAX_CONCURRENT_REQUESTS,
+                              max_retries=retries)
+        self.session.mount('https://', adapter)
+        self._token: Optional[Tuple[str, float]] = None  # (access_token, fetched_at)
+        # Set to abort the rate-limit waits of requests already in progress;
+        # replaced on cancel so requests started afterwards are unaffected
+        self.cancel_event = threading.Event()
+        
+        # Async transport, created on first use inside the event loop that drives it
+        self._async_client: Optional[httpx.AsyncClient] = None
+        self._async_sem: Optional[asyncio.Semaphore] = None
+    
+    def _fresh_token(self) -> Optional[str]:
+        """The cached access token if it can be reused without a refresh check"""
+        cached = self._token
+        if cached and time.monotonic() - cached[1] < TOKEN_CACHE_TTL:
+            return cached[0]
+        return None
+    
+    def _get_access_token(self) -> str:
+        """Get access token, reusing the cached one while it is fresh"""
+        cached_token = self._fresh_token()
+        if cached_token:
+            return cached_token
         
-    def _get_headers(self) -> Dict[str, str]:
-        """Get HTTP headers with current access token"""
         access_token = self.auth_manager.get_access_token()
         if not access_token:
+            self._token = None
             raise Exception("No valid access token available")
         
+        self._token = (access_token, time.monotonic())
+        return access_token
+    
+    def invalidate_token(self) -> None:
+        """Drop the cached access token so the next request fetches a fresh one"""
+        self._token = None
+    
+    def cancel_pending_retries(self) -> None:
+        """
+        Wake up and abort synchronous requests currently waiting out a rate limit
+        
+        Only requests already in progress are cancelled; later requests get a
+        fresh cancel event. Async requests are cancelled by cancelling the task
+        awaiting them instead.
+        """
+        cancel_event, self.cancel_event = self.cancel_event, threading.Event()
+        cancel_event.set()
+    
+    def _wait_for_retry(self, retry_after: float, cancel_event: threading.Event) -> None:
+        """Sleep until a capped, jittered deadline unless the request's cancel event is set"""
+        wake_at = time.monotonic() + min(retry_after, MAX_RETRY_AFTER) + random.uniform(0, RETRY_JITTER)
+        if cancel_event.wait(max(wake_at - time.monotonic(), 0)):
+            raise Exception("Request cancelled while waiting for rate limit")
+        
+    def _send(self, method: str, url: str, headers: Dict[str, str], **kwargs) -> requests.Response:
+        """Send a request while holding one of the shared concurrency slots"""
+        global _checked_out
+        with _graph_sem:
+            with _checked_out_lock:
+                _checked_out += 1
+            try:
+                return self.session.request(method, url, headers=headers, **kwargs)
+            finally:
+                with _checked_out_lock:
+                    _checked_out -= 1
+        
+    def _get_headers(self) -> Dict[str, str]:
+        """Get HTTP headers with current access token"""
+        access_token = self._get_access_token()
+        
         return {
             'Authorization': f'Bearer {access_token}',
             'Content-Type': 'application/json',
             'Accept': 'application/json'
         }
     
+    def _check_response(self, response, attempt: int, max_retries: int,
+                        token_refreshed: bool) -> Optional[Tuple[str, float]]:
+        """
+        Classify a Graph API response (requests or httpx)
+        
+        Returns:
+            None if the response is usable, otherwise (action, wait_seconds) where
+            action is 'refresh' (retry with a new token), 'rate_limit' or 'backoff'
+            
+        Raises:
+            Exception: If the error is not retryable or retries are exhausted
+        """
+        status_code = response.status_code
+        
+        if status_code == 401:
+            # Cached token may be stale - refresh it once before giving up
+            self.invalidate_token()
+            if not token_refreshed and attempt < max_retries:
+                logger.warning("Access token rejected, refreshing and retrying")
+                return ('refresh', 0)
+            raise Exception("Authentication failed (401) - token may be expired")
+        elif status_code == 403:
+            raise Exception("Access forbidden - insufficient permissions")
+        elif status_code == 429:
+            # Microsoft Graph rate limiting - respect Retry-After header
+            retry_after = _parse_retry_after(response.headers.get('Retry-After'))
+            if retry_after is None:
+                # No usable Retry-After header - fall back to exponential backoff
+                retry_after = min(2 ** attempt, MAX_RETRY_AFTER)
+            if attempt < max_retries:
+                logger.warning(f"Rate limit hit, waiting {retry_after:.0f} seconds (attempt {attempt + 1}/{max_retries})")
+                return ('rate_limit', retry_after)
+            raise Exception(f"Rate limit exceeded after {max_retries} retries - please wait before retrying")
+        elif status_code == 503:
+            # Service unavailable - exponential backoff
+            if attempt < max_retries:
+                wait_time = min(2 ** attempt, 60)  # Max 60 seconds
+                logger.warning(f"Service unavailable, waiting {wait_time} seconds (attempt {attempt + 1}/{max_retries})")
+                return ('backoff', wait_time)
+            raise Exception("Microsoft Graph service temporarily unavailable")
+        elif status_code >= 400:
+            raise Exception(f"Graph API request failed: {status_code} - {response.text}")
+        
+        return None
+    
     def _make_request(self, method: str, url: str, max_retries: int = 3, **kwargs) -> Dict[str, Any]:
         """
         Make authenticated request to Graph API with proper rate limiting
@@ -51,39 +239,25 @@ class GraphClient:
             Exception: If request fails or authentication issues
         """
         last_exception = None
+        token_refreshed = False
+        cancel_event = self.cancel_event  # Cancels this call only
         
         for attempt in range(max_retries + 1):
             try:
                 headers = self._get_headers()
-                response = self.session.request(method, url, headers=headers, **kwargs)
+                response = self._send(method, url, headers, **kwargs)
                 
-                if response.status_code == 401:
-                    raise Exception("Authentication failed - token may be expired")
-                elif response.status_code == 403:
-                    raise Exception("Access forbidden - insufficient permissions")
-                elif response.status_code == 429:
-                    # Microsoft Graph rate limiting - respect Retry-After header
-                    retry_after = int(response.headers.get('Retry-After', 60))
-                    if attempt < max_retries:
-                        logger.warning(f"Rate limit hit, waiting {retry_after} seconds (attempt {attempt + 1}/{max_retries})")
-                        time.sleep(retry_after)
-                        continue
-                    else:
-                        raise Exception(f"Rate limit exceeded after {max_retries} retries - please wait before retrying")
-                elif response.status_code == 503:
-                    # Service unavailable - exponential backoff
-                    if attempt < max_retries:
-                        wait_time = min(2 ** attempt, 60)  # Max 60 seconds
-                        logger.warning(f"Service unavailable, waiting {wait_time} seconds (attempt {attempt + 1}/{max_retries})")
-                        time.sleep(wait_time)
-                        continue
-                    else:
-                        raise Exception("Microsoft Graph service temporarily unavailable")
-                elif not response.ok:
-                    error_msg = f"Graph API request failed: {response.status_code} - {response.text}"
-                    raise Exception(error_msg)
+                retry = self._check_response(response, attempt, max_retries, token_refreshed)
+                if retry is None:
+                    return response.json()
                 
-                return response.json()
+                action, wait_time = retry
+                if action == 'refresh':
+                    token_refreshed = True
+                elif action == 'rate_limit':
+                    self._wait_for_retry(wait_time, cancel_event)
+                else:
+                    time.sleep(wait_time)
                 
             except requests.exceptions.RequestException as e:
                 last_exception = e
@@ -103,6 +277,77 @@ class GraphClient:
         if last_exception:
             raise Exception(f"Request failed after {max_retries} retries: {str(last_exception)}")
     
+    def _get_async_client(self) -> httpx.AsyncClient:
+        """Get the pooled HTTP/2 client for the running event loop"""
+        if self._async_client is None:
+            self._async_client = httpx.AsyncClient(http2=True, timeout=30.0)
+            self._async_sem = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+        return self._async_client
+    
+    async def _make_request_async(self, method: str, url: str, max_retries: int = 3, **kwargs) -> Dict[str, Any]:
+        """
+        Async counterpart of _make_request using a shared httpx.AsyncClient
+        
+        Must always be awaited on the same event loop, since the client and its
+        connection pool are bound to the loop they were created on. Rate-limit
+        waits are abandoned by cancelling the awaiting task; cancel_pending_retries
+        only applies to synchronous requests.
+        """
+        client = self._get_async_client()
+        last_exception = None
+        token_refreshed = False
+        
+        for attempt in range(max_retries + 1):
+            try:
+                # Refreshing the token may hit the keychain, so keep it off the loop
+                if self._fresh_token():
+                    headers = self._get_headers()
+                else:
+                    headers = await asyncio.to_thread(self._get_headers)
+                
+                async with self._async_sem:
+                    response = await client.request(method, url, headers=headers, **kwargs)
+                
+                retry = self._check_response(response, attempt, max_retries, token_refreshed)
+                if retry is None:
+                    return response.json()
+                
+                action, wait_time = retry
+                if action == 'refresh':
+                    token_refreshed = True
+                elif action == 'rate_limit':
+                    await asyncio.sleep(min(wait_time, MAX_RETRY_AFTER) + random.uniform(0, RETRY_JITTER))
+                else:
+                    await asyncio.sleep(wait_time)
+                
+            except httpx.TransportError as e:
+                last_exception = e
+                if attempt < max_retries:
+                    wait_time = min(2 ** attempt, 30)  # Exponential backoff up to 30 seconds
+                    logger.warning(f"Network error, retrying in {wait_time} seconds: {str(e)}")
+                    await asyncio.sleep(wait_time)
+                    continue
+                else:
+                    logger.error(f"Network error in Graph API request after {max_retries} retries: {str(e)}")
+                    raise Exception(f"Network error: {str(e)}")
+            except json.JSONDecodeError as e:
+                logger.error(f"Failed to parse Graph API response: {str(e)}")
+                raise Exception("Invalid response from Graph API")
+        
+        if last_exception:
+            raise Exception(f"Request failed after {max_retries} retries: {str(last_exception)}")
+    
+    def close(self) -> None:
+        """Close the synchronous HTTP session and its connection pool"""
+        self.session.close()
+    
+    async def aclose(self) -> None:
+        """Close the async HTTP client; await on the loop that used it"""
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+            self._async_sem = None
+    
     def get_user_profile(self) -> Dict[str, Any]:
         """
         Get current user's profile information
@@ -113,24 +358,38 @@ class GraphClient:
         try:
             logger.info("Fetching user profile")
             response = self._make_request('GET', USER_ENDPOINT)
-            
-            user_info = {
-                'displayName': response.get('displayName', 'Unknown User'),
-                'mail': response.get('mail', response.get('userPrincipalName', 'Unknown Email')),
-                'id': response.get('id', ''),
-                'jobTitle': response.get('jobTitle', ''),
-                'officeLocation': response.get('officeLocation', '')
-            }
-            
-            logger.info(f"User profile retrieved for: {user_info['displayName']}")
-            return user_info
-            
+            return self._parse_user_profile(response)
+        except Exception as e:
+            raise self._user_profile_error(e)
+    
+    async def get_user_profile_async(self) -> Dict[str, Any]:
+        """Async variant of get_user_profile"""
+        try:
+            logger.info("Fetching user profile")
+            response = await self._make_request_async('GET', USER_ENDPOINT)
+            return self._parse_user_profile(response)
         except Exception as e:
-            logger.error(f"Failed to get user profile: {str(e)}")
-            if "401" in str(e):
-                raise Exception("Authentication expired. Please login again.")
-            else:
-                raise Exception(f"Failed to get user profile: {str(e)}")
+            raise self._user_profile_error(e)
+    
+    def _parse_user_profile(self, response: Dict[str, Any]) -> Dict[str, Any]:
+        """Build user info from a /me response"""
+        user_info = {
+            'displayName': response.get('displayName', 'Unknown User'),
+            'mail': response.get('mail', response.get('userPrincipalName', 'Unknown Email')),
+            'id': response.get('id', ''),
+            'jobTitle': response.get('jobTitle', ''),
+            'officeLocation': response.get('officeLocation', '')
+        }
+        
+        logger.info(f"User profile retrieved for: {user_info['displayName']}")
+        return user_info
+    
+    def _user_profile_error(self, e: Exception) -> Exception:
+        """Map a profile fetch failure to a user-friendly exception"""
+        logger.error(f"Failed to get user profile: {str(e)}")
+        if "401" in str(e):
+            return Exception("Authentication expired. Please login again.")
+        return Exception(f"Failed to get user profile: {str(e)}")
     
     def get_mailbox_folders(self) -> List[Dict[str, Any]]:
         """
@@ -179,70 +438,144 @@ class GraphClient:
             List of email dictionaries
         """
         try:
-            # Build the API endpoint
-            if folder_id:
-                endpoint = f"{FOLDERS_ENDPOINT}/{folder_id}/messages"
-            else:
-                endpoint = MESSAGES_ENDPOINT
-            
-            # Build query parameters
-            params = {
-                '$top': min(max_results, 999),  # Graph API max is 999
-                '$select': 'id,subject,from,receivedDateTime,bodyPreview,isRead,hasAttachments,importance',
-                '$orderby': 'receivedDateTime desc'
-            }
-            
-            # Add search filter if provided
-            filters = []
-            
-            if search_query:
-                # Sanitize and use Graph search syntax for better results
-                sanitized_query = search_query.replace('"', '').strip()
-                if sanitized_query:
-                    params['$search'] = f'"{sanitized_query}"'
-            
-            if days_back and days_back > 0:
-                # Filter by date range
-                cutoff_date = (datetime.now() - timedelta(days=days_back)).isoformat() + 'Z'
-                filters.append(f"receivedDateTime ge {cutoff_date}")
-            
-            if filters:
-                params['$filter'] = ' and '.join(filters)
-            
-            logger.info(f"Searching emails with params: {params}")
-            
-            # Make the request
+            endpoint, params = self._search_request(search_query, folder_id, max_results, days_back)
             response = self._make_request('GET', endpoint, params=params)
-            
-            # Process results
-            emails = []
-            for message in response.get('value', []):
-                email_info = {
-                    'id': message.get('id', ''),
-                    'subject': message.get('subject', '(No Subject)'),
-                    'from': self._extract_email_address(message.get('from', {})),
-                    'receivedDateTime': self._format_datetime(message.get('receivedDateTime')),
-                    'bodyPreview': message.get('bodyPreview', ''),
-                    'isRead': message.get('isRead', False),
-                    'hasAttachments': message.get('hasAttachments', False),
-                    'importance': message.get('importance', 'normal')
-                }
-                emails.append(email_info)
-            
-            logger.info(f"Found {len(emails)} emails matching search criteria")
-            return emails
-            
+            return self._parse_search_results(response)
+        except Exception as e:
+            raise self._search_error(e)
+    
+    async def search_emails_async(self,
+                                  search_query: str = None,
+                                  folder_id: str = None,
+                                  max_results: int = 50,
+                                  days_back: int = None) -> List[Dict[str, Any]]:
+        """Async variant of search_emails"""
+        try:
+            endpoint, params = self._search_request(search_query, folder_id, max_results, days_back)
+            response = await self._make_request_async('GET', endpoint, params=params)
+            return self._parse_search_results(response)
+        except Exception as e:
+            raise self._search_error(e)
+    
+    async def search_email_pages_async(self,
+                                       search_query: str = None,
+                                       folder_id: str = None,
+                                       max_results: int = 50,
+                                       days_back: int = None,
+                                       page_size: int = 25):
+        """
+        Async generator yielding search results one page at a time
+        
+        Takes the same filters as search_emails and follows @odata.nextLink until
+        max_results emails have been yielded, so callers can show the first page
+        while later ones are still loading.
+        
+        Yields:
+            Lists of email dictionaries, as returned by search_emails
+        """
+        try:
+            endpoint, params = self._search_request(search_query, folder_id,
+                                                    min(page_size, max_results), days_back)
+            remaining = max_results
+            while endpoint and remaining > 0:
+                response = await self._make_request_async('GET', endpoint, params=params)
+                emails = self._parse_search_results(response)[:remaining]
+                remaining -= len(emails)
+                if emails:
+                    yield emails
+                # nextLink already carries the query parameters
+                endpoint, params = response.get('@odata.nextLink'), None
+        except Exception as e:
+            raise self._search_error(e)
+    
+    def list_messages(self,
+                      search_query: str = None,
+                      folder_id: str = None,
+                      max_results: int = 50,
+                      days_back: int = None) -> List[Dict[str, Any]]:
+        """
+        Search for emails, returning the Graph message resources as-is
+        
+        Takes the same filters as search_emails, but keeps Graph's JSON shape
+        (e.g. nested 'from') for callers that pass results through to API clients.
+        Everything needed is selected in the one list call, so no per-message
+        fetches are made.
+        
+        Returns:
+            List of Graph message dictionaries
+        """
+        try:
+            endpoint, params = self._search_request(search_query, folder_id, max_results, days_back)
+            params['$select'] = self._MESSAGE_LIST_SELECT
+            response = self._make_request('GET', endpoint, params=params)
+            return response.get('value', [])
         except Exception as e:
-            logger.error(f"Failed to search emails: {str(e)}")
-            # Provide more user-friendly error messages
-            if "401" in str(e):
-                raise Exception("Authentication expired. Please login again.")
-            elif "403" in str(e):
-                raise Exception("Access denied. Check your permissions.")
-            elif "429" in str(e):
-                raise Exception("Too many requests. Please wait and try again.")
-            else:
-                raise Exception(f"Email search failed: {str(e)}")
+            raise self._search_error(e)
+    
+    def _search_request(self, search_query: Optional[str], folder_id: Optional[str],
+                        max_results: int, days_back: Optional[int]) -> Tuple[str, Dict[str, Any]]:
+        """Build the endpoint and query parameters for an email search"""
+        # Build the API endpoint
+        if folder_id:
+            endpoint = self._FOLDER_URL_PREFIX + folder_id + "/messages"
+        else:
+            endpoint = MESSAGES_ENDPOINT
+        
+        # Build query parameters
+        params = {**self._LIST_PARAMS_BASE, '$top': min(max_results, 999)}  # Graph API max is 999
+        
+        # Add search filter if provided
+        filters = []
+        
+        if search_query:
+            # Sanitize and use Graph search syntax for better results
+            sanitized_query = search_query.replace('"', '').strip()
+            if sanitized_query:
+                params['$search'] = f'"{sanitized_query}"'
+                # Graph rejects $orderby together with $search; search results
+                # already come back newest first
+                del params['$orderby']
+        
+        if days_back and days_back > 0:
+            # Filter by date range
+            cutoff_date = (datetime.now() - timedelta(days=days_back)).isoformat() + 'Z'
+            filters.append(f"receivedDateTime ge {cutoff_date}")
+        
+        if filters:
+            params['$filter'] = ' and '.join(filters)
+        
+        logger.info(f"Searching emails with params: {params}")
+        return endpoint, params
+    
+    def _parse_search_results(self, response: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Build email summaries from a message list response"""
+        emails = []
+        for message in response.get('value', []):
+            email_info = {
+                'id': message.get('id', ''),
+                'subject': message.get('subject', '(No Subject)'),
+                'from': _extract_addr(message.get('from')),
+                'receivedDateTime': self._format_datetime(message.get('receivedDateTime')),
+                'bodyPreview': message.get('bodyPreview', ''),
+                'isRead': message.get('isRead', False),
+                'hasAttachments': message.get('hasAttachments', False),
+                'importance': message.get('importance', 'normal')
+            }
+            emails.append(email_info)
+        
+        logger.info(f"Found {len(emails)} emails matching search criteria")
+        return emails
+    
+    def _search_error(self, e: Exception) -> Exception:
+        """Map a search failure to a user-friendly exception"""
+        logger.error(f"Failed to search emails: {str(e)}")
+        if "401" in str(e):
+            return Exception("Authentication expired. Please login again.")
+        elif "403" in str(e):
+            return Exception("Access denied. Check your permissions.")
+        elif "429" in str(e):
+            return Exception("Too many requests. Please wait and try again.")
+        return Exception(f"Email search failed: {str(e)}")
     
     def get_email_details(self, message_id: str) -> Dict[str, Any]:
         """
@@ -255,41 +588,51 @@ class GraphClient:
             Dict containing detailed email information
         """
         try:
-            endpoint = f"{MESSAGES_ENDPOINT}/{message_id}"
-            params = {
-                '$select': 'id,subject,from,toRecipients,ccRecipients,receivedDateTime,sentDateTime,body,bodyPreview,isRead,hasAttachments,importance,categories'
-            }
-            
             logger.info(f"Fetching email details for message: {message_id}")
-            response = self._make_request('GET', endpoint, params=params)
-            
-            email_details = {
-                'id': response.get('id', ''),
-                'subject': response.get('subject', '(No Subject)'),
-                'from': self._extract_email_address(response.get('from', {})),
-                'to': [self._extract_email_address(recipient) for recipient in response.get('toRecipients', [])],
-                'cc': [self._extract_email_address(recipient) for recipient in response.get('ccRecipients', [])],
-                'receivedDateTime': self._format_datetime(response.get('receivedDateTime')),
-                'sentDateTime': self._format_datetime(response.get('sentDateTime')),
-                'body': self._extract_body_content(response.get('body', {})),
-                'bodyPreview': response.get('bodyPreview', ''),
-                'isRead': response.get('isRead', False),
-                'hasAttachments': response.get('hasAttachments', False),
-                'importance': response.get('importance', 'normal'),
-                'categories': response.get('categories', [])
-            }
-            
-            logger.info(f"Retrieved email details: {email_details['subject']}")
-            return email_details
-            
+            response = self._make_request('GET', self._MESSAGE_URL_PREFIX + message_id, params=self._DETAIL_PARAMS)
+            return self._parse_email_details(response)
+        except Exception as e:
+            raise self._email_details_error(e)
+    
+    async def get_email_details_async(self, message_id: str) -> Dict[str, Any]:
+        """Async variant of get_email_details"""
+        try:
+            logger.info(f"Fetching email details for message: {message_id}")
+            response = await self._make_request_async('GET', self._MESSAGE_URL_PREFIX + message_id,
+                                                      params=self._DETAIL_PARAMS)
+            return self._parse_email_details(response)
         except Exception as e:
-            logger.error(f"Failed to get email details: {str(e)}")
-            if "401" in str(e):
-                raise Exception("Authentication expired. Please login again.")
-            elif "404" in str(e):
-                raise Exception("Email not found or may have been deleted.")
-            else:
-                raise Exception(f"Failed to get email details: {str(e)}")
+            raise self._email_details_error(e)
+    
+    def _parse_email_details(self, response: Dict[str, Any]) -> Dict[str, Any]:
+        """Build detailed email information from a message response"""
+        email_details = {
+            'id': response.get('id', ''),
+            'subject': response.get('subject', '(No Subject)'),
+            'from': _extract_addr(response.get('from')),
+            'to': list(map(_extract_addr, response.get('toRecipients') or ())),
+            'cc': list(map(_extract_addr, response.get('ccRecipients') or ())),
+            'receivedDateTime': self._format_datetime(response.get('receivedDateTime')),
+            'sentDateTime': self._format_datetime(response.get('sentDateTime')),
+            'body': self._extract_body_content(response.get('body', {})),
+            'bodyPreview': response.get('bodyPreview', ''),
+            'isRead': response.get('isRead', False),
+            'hasAttachments': response.get('hasAttachments', False),
+            'importance': response.get('importance', 'normal'),
+            'categories': response.get('categories', [])
+        }
+        
+        logger.info(f"Retrieved email details: {email_details['subject']}")
+        return email_details
+    
+    def _email_details_error(self, e: Exception) -> Exception:
+        """Map a details fetch failure to a user-friendly exception"""
+        logger.error(f"Failed to get email details: {str(e)}")
+        if "401" in str(e):
+            return Exception("Authentication expired. Please login again.")
+        elif "404" in str(e):
+            return Exception("Email not found or may have been deleted.")
+        return Exception(f"Failed to get email details: {str(e)}")
     
     def mark_as_read(self, message_id: str) -> bool:
         """
@@ -301,37 +644,54 @@ class GraphClient:
         Returns:
             bool: True if successful, False otherwise
         """
-        try:
-            endpoint = f"{MESSAGES_ENDPOINT}/{message_id}"
-            data = {'isRead': True}
+        return self.mark_many_as_read([message_id]).get(message_id, False)
+    
+    def mark_many_as_read(self, message_ids: List[str]) -> Dict[str, bool]:
+        """
+        Mark several emails as read using Graph $batch requests
+        
+        Args:
+            message_ids: IDs of the email messages
             
-            logger.info(f"Marking email as read: {message_id}")
-            self._make_request('PATCH', endpoint, json=data)
+        Returns:
+            Dict mapping each message ID to True if it was marked read
+        """
+        results = {message_id: False for message_id in message_ids}
+        logger.info(f"Marking {len(message_ids)} emails as read")
+        
+        for start in range(0, len(message_ids), GRAPH_BATCH_LIMIT):
+            chunk = message_ids[start:start + GRAPH_BATCH_LIMIT]
+            payload = {
+                'requests': [
+                    {
+                        'id': str(i),
+                        'method': 'PATCH',
+                        'url': f"/me/messages/{message_id}",
+                        'headers': {'Content-Type': 'application/json'},
+                        'body': {'isRead': True}
+                    }
+                    for i, message_id in enumerate(chunk)
+                ]
+            }
             
-            logger.info("Email marked as read successfully")
-            return True
+            try:
+                response = self._make_request('POST', BATCH_ENDPOINT, json=payload)
+            except Exception as e:
+                logger.error(f"Failed to mark email batch as read: {str(e)}")
+                continue
             
-        except Exception as e:
-            logger.error(f"Failed to mark email as read: {str(e)}")
-            return False
-    
-    def _extract_email_address(self, email_obj: Dict[str, Any]) -> str:
-        """Extract email address from Graph API email object"""
-        if not email_obj:
-            return "Unknown"
-        
-        email_addr = email_obj.get('emailAddress', {})
-        name = email_addr.get('name', '')
-        address = email_addr.get('address', '')
+            for item in response.get('responses', []):
+                try:
+                    index = int(item.get('id'))
+                except (TypeError, ValueError):
+                    continue
+                if 0 <= index < len(chunk):
+                    results[chunk[index]] = 200 <= item.get('status', 0) < 300
         
-        if name and address:
-            return f"{name} <{address}>"
-        elif address:
-            return address
-        elif name:
-            return name
-        else:
-            return "Unknown"
+        logger.info(f"Marked {sum(results.values())}/{len(message_ids)} emails as read")
+        return results
+    
+    _extract_email_address = staticmethod(_extract_addr)
     
     def _extract_body_content(self, body_obj: Dict[str, Any]) -> str:
         """Extract body content from Graph API body object"""
@@ -5,20 +5,71 @@ Tkinter-based interface for authentication and email browsing
 
 import tkinter as tk
 from tkinter import ttk, scrolledtext, messagebox
+import asyncio
+import os
 import threading
 import logging
+from collections import OrderedDict
+from datetime import datetime
 from typing import List, Dict, Any, Optional
 from config import APP_NAME, WINDOW_WIDTH, WINDOW_HEIGHT
 from auth_manager import AuthManager
 from graph_client import GraphClient
 
-# Configure logging
+# Configure logging - quiet by default, set YACHT_LOG=INFO (or DEBUG) for traces
 logging.basicConfig(
-    level=logging.INFO,
+    level=os.environ.get('YACHT_LOG', 'WARNING').upper(),
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
 logger = logging.getLogger(__name__)
 
+# Email list virtualization: only rows in the visible window (plus a small
+# buffer) exist as Treeview items at any time
+EMAIL_LIST_HEIGHT = 12
+RENDER_BUFFER = 8
+
+# Number of recently opened emails kept in memory for instant re-open
+DETAILS_CACHE_SIZE = 64
+
+# Quiet period before a search request is sent, collapsing repeated Enter/clicks
+SEARCH_DEBOUNCE_MS = 250
+
+# Keys still honoured by the read-only details pane
+READ_ONLY_NAV_KEYS = frozenset(('Left', 'Right', 'Up', 'Down', 'Prior', 'Next', 'Home', 'End'))
+
+def format_email_date(value: str) -> str:
+    """Format a received timestamp for the results list"""
+    try:
+        return datetime.fromisoformat(value).strftime('%Y-%m-%d %H:%M')
+    except (TypeError, ValueError):
+        return value
+
+def build_email_rows(emails: List[Dict[str, Any]]) -> List[tuple]:
+    """
+    Precompute (text, values) for every email row
+    
+    Runs on the worker thread so the Tk loop only forwards finished strings.
+    The formatted date is cached on each email as 'receivedDateTimeStr'.
+    """
+    rows = []
+    append = rows.append
+    for i, email in enumerate(emails):
+        subject = email['subject']
+        sender = email['from']
+        received = email.get('receivedDateTimeStr')
+        if received is None:
+            received = email['receivedDateTimeStr'] = format_email_date(email['receivedDateTime'])
+        append((
+            str(i + 1),
+            (
+                subject[:50] + '...' if len(subject) > 50 else subject,
+                sender[:30] + '...' if len(sender) > 30 else sender,
+                received,
+                'Yes' if email['isRead'] else 'No'
+            )
+        ))
+    return rows
+
 class YachtEmailReaderApp:
     """Main application class for the GUI"""
     
@@ -33,10 +84,23 @@ class YachtEmailReaderApp:
         self.auth_manager = AuthManager()
         self.graph_client = GraphClient(self.auth_manager)
         
+        # Graph calls run as coroutines on one background event loop, sharing a
+        # single HTTP/2 connection pool, instead of a thread per action
+        self._loop = asyncio.new_event_loop()
+        threading.Thread(target=self._loop.run_forever, name='graph-loop', daemon=True).start()
+        self._search_future = None
+        self._search_generation = 0
+        self._search_after_id = None  # Pending debounced search, see _request_search
+        
         # Application state
-        self.user_info = None
+        self.user_info = None  # Profile of the signed-in user, fetched once per session
+        self._details_cache = OrderedDict()  # message_id -> email details, LRU order
+        self._details_cache_lock = threading.Lock()
         self.current_emails = []
+        self._email_rows = []  # Display rows matching current_emails, see build_email_rows
         self.selected_email = None
+        self._rendered = (0, 0)  # Index range [first, last) realized in the tree
+        self._last_status_success = None  # Style currently applied to status_label
         
         # GUI components
         self.setup_styles()
@@ -69,6 +133,9 @@ class YachtEmailReaderApp:
         self.main_frame = ttk.Frame(self.root, padding="10")
         self.main_frame.configure(style='Main.TFrame')
         
+        # Shared by the header status label and the status bar
+        self.status_var = tk.StringVar(value="Not authenticated")
+        
         # Header section
         self.header_frame = ttk.Frame(self.main_frame)
         
@@ -80,7 +147,7 @@ class YachtEmailReaderApp:
         
         self.status_label = ttk.Label(
             self.header_frame,
-            text="Not authenticated",
+            textvariable=self.status_var,
             style='Error.TLabel'
         )
         
@@ -119,12 +186,12 @@ class YachtEmailReaderApp:
             textvariable=self.search_var,
             width=40
         )
-        self.search_entry.bind('<Return>', lambda e: self.handle_search())
+        self.search_entry.bind('<Return>', lambda e: self._request_search())
         
         self.search_button = ttk.Button(
             self.search_frame,
             text="Search",
-            command=self.handle_search,
+            command=self._request_search,
             state=tk.DISABLED
         )
         
@@ -135,17 +202,6 @@ class YachtEmailReaderApp:
             state=tk.DISABLED
         )
         
-        # Filter options
-        self.filter_frame = ttk.Frame(self.search_frame)
-        
-        self.days_label = ttk.Label(self.filter_frame, text="Days back:")
-        self.days_var = tk.StringVar(value="30")
-        self.days_entry = ttk.Entry(self.filter_frame, textvariable=self.days_var, width=10)
-        
-        self.max_results_label = ttk.Label(self.filter_frame, text="Max results:")
-        self.max_results_var = tk.StringVar(value="50")
-        self.max_results_entry = ttk.Entry(self.filter_frame, textvariable=self.max_results_var, width=10)
-        
         # Results section
         self.results_frame = ttk.LabelFrame(self.main_frame, text="Email Results", padding="10")
         
@@ -154,7 +210,7 @@ class YachtEmailReaderApp:
             self.results_frame,
             columns=('Subject', 'From', 'Date', 'Read'),
             show='tree headings',
-            height=12
+            height=EMAIL_LIST_HEIGHT
         )
         
         self.email_tree.heading('#0', text='#')
@@ -171,24 +227,18 @@ class YachtEmailReaderApp:
         
         self.email_tree.bind('<<TreeviewSelect>>', self.on_email_select)
         self.email_tree.bind('<Double-1>', self.on_email_double_click)
+        self.email_tree.bind('<Configure>', lambda e: self._scroll_to(self._rendered[0]))
+        self.email_tree.bind('<MouseWheel>', self._on_mouse_wheel)
+        self.email_tree.bind('<Button-4>', lambda e: self._scroll_by(-3))
+        self.email_tree.bind('<Button-5>', lambda e: self._scroll_by(3))
+        self.email_tree.bind('<Up>', lambda e: self._on_arrow_key(-1))
+        self.email_tree.bind('<Down>', lambda e: self._on_arrow_key(1))
         
-        # Scrollbar for email list
-        self.email_scrollbar = ttk.Scrollbar(self.results_frame, orient=tk.VERTICAL, command=self.email_tree.yview)
-        self.email_tree.configure(yscrollcommand=self.email_scrollbar.set)
-        
-        # Email details section
-        self.details_frame = ttk.LabelFrame(self.main_frame, text="Email Details", padding="10")
-        
-        self.details_text = scrolledtext.ScrolledText(
-            self.details_frame,
-            height=10,
-            wrap=tk.WORD,
-            state=tk.DISABLED
-        )
+        # Scrollbar for email list - drives the virtual window over current_emails
+        self.email_scrollbar = ttk.Scrollbar(self.results_frame, orient=tk.VERTICAL, command=self._on_scrollbar)
         
         # Status bar
         self.status_frame = ttk.Frame(self.main_frame)
-        self.status_var = tk.StringVar(value="Ready")
         self.status_bar = ttk.Label(self.status_frame, textvariable=self.status_var)
     
     def setup_layout(self):
@@ -233,33 +283,72 @@ class YachtEmailReaderApp:
         self.search_button.grid(row=0, column=2, padx=(0, 5))
         self.clear_button.grid(row=0, column=3)
         
-        # Filter layout
+        # Results layout
+        self.results_frame.grid(row=3, column=0, sticky=(tk.W, tk.E, tk.N, tk.S), pady=(0, 10))
+        self.results_frame.columnconfigure(0, weight=1)
+        self.results_frame.rowconfigure(0, weight=1)
+        
+        self.email_tree.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        self.email_scrollbar.grid(row=0, column=1, sticky=(tk.N, tk.S))
+        
+        # Status bar layout
+        self.status_frame.grid(row=5, column=0, sticky=(tk.W, tk.E))
+        self.status_frame.columnconfigure(0, weight=1)
+        self.status_bar.grid(row=0, column=0, sticky=tk.W)
+    
+    def _create_filter_widgets(self):
+        """Build the search filter options; deferred until search is enabled"""
+        if hasattr(self, 'filter_frame'):
+            return
+        
+        self.filter_frame = ttk.Frame(self.search_frame)
+        
+        self.days_label = ttk.Label(self.filter_frame, text="Days back:")
+        self.days_var = tk.StringVar(value="30")
+        self.days_entry = ttk.Entry(self.filter_frame, textvariable=self.days_var, width=10)
+        
+        self.max_results_label = ttk.Label(self.filter_frame, text="Max results:")
+        self.max_results_var = tk.StringVar(value="50")
+        self.max_results_entry = ttk.Entry(self.filter_frame, textvariable=self.max_results_var, width=10)
+        
         self.filter_frame.grid(row=1, column=0, columnspan=4, sticky=(tk.W, tk.E), pady=(10, 0))
         
         self.days_label.grid(row=0, column=0, sticky=tk.W, padx=(0, 5))
         self.days_entry.grid(row=0, column=1, padx=(0, 20))
         self.max_results_label.grid(row=0, column=2, sticky=tk.W, padx=(0, 5))
         self.max_results_entry.grid(row=0, column=3)
+    
+    def _create_details_widgets(self):
+        """Build the email details pane; deferred until an email is first shown"""
+        if hasattr(self, 'details_text'):
+            return
         
-        # Results layout
-        self.results_frame.grid(row=3, column=0, sticky=(tk.W, tk.E, tk.N, tk.S), pady=(0, 10))
-        self.results_frame.columnconfigure(0, weight=1)
-        self.results_frame.rowconfigure(0, weight=1)
+        self.details_frame = ttk.LabelFrame(self.main_frame, text="Email Details", padding="10")
         
-        self.email_tree.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
-        self.email_scrollbar.grid(row=0, column=1, sticky=(tk.N, tk.S))
+        # Left in NORMAL state and made read-only through bindings, so updating
+        # it does not need a state toggle around every delete/insert
+        self.details_text = scrolledtext.ScrolledText(
+            self.details_frame,
+            height=10,
+            wrap=tk.WORD
+        )
+        self.details_text.bind('<Key>', self._block_details_edit)
+        for sequence in ('<<Paste>>', '<<Cut>>', '<<Clear>>', '<<PasteSelection>>'):
+            self.details_text.bind(sequence, lambda e: 'break')
         
-        # Details layout
         self.details_frame.grid(row=4, column=0, sticky=(tk.W, tk.E, tk.N, tk.S), pady=(0, 10))
         self.details_frame.columnconfigure(0, weight=1)
         self.details_frame.rowconfigure(0, weight=1)
         
         self.details_text.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
-        
-        # Status bar layout
-        self.status_frame.grid(row=5, column=0, sticky=(tk.W, tk.E))
-        self.status_frame.columnconfigure(0, weight=1)
-        self.status_bar.grid(row=0, column=0, sticky=tk.W)
+    
+    def _block_details_edit(self, event):
+        """Swallow editing keys in the details pane, keeping navigation and copy"""
+        if event.keysym in READ_ONLY_NAV_KEYS:
+            return None
+        if event.state & 0xC and event.keysym.lower() in ('c', 'a'):  # Control/Command-C and -A
+            return None
+        return 'break'
     
     def check_auth_status(self):
         """Check and update authentication status"""
@@ -269,9 +358,10 @@ class YachtEmailReaderApp:
             self.logout_button.config(state=tk.NORMAL)
             self.search_button.config(state=tk.NORMAL)
             self.clear_button.config(state=tk.NORMAL)
+            self._create_filter_widgets()
             
             # Get user info
-            threading.Thread(target=self.load_user_info, daemon=True).start()
+            self._submit(self.load_user_info())
         else:
             self.update_status("Not authenticated", success=False)
             self.login_button.config(state=tk.NORMAL)
@@ -281,12 +371,16 @@ class YachtEmailReaderApp:
     
     def update_status(self, message: str, success: bool = True):
         """Update status display"""
-        self.status_label.config(
-            text=message,
-            style='Success.TLabel' if success else 'Error.TLabel'
-        )
+        if success != self._last_status_success:
+            self.status_label.configure(style='Success.TLabel' if success else 'Error.TLabel')
+            self._last_status_success = success
         self.status_var.set(message)
     
+    def _report_error(self, title: str, msg: str):
+        """Show an error in the status bar and a dialog; call on the UI thread"""
+        self.update_status(msg, success=False)
+        messagebox.showerror(title, msg)
+    
     def handle_login(self):
         """Handle login button click"""
         self.update_status("Authenticating...")
@@ -295,6 +389,8 @@ class YachtEmailReaderApp:
         def login_thread():
             success = self.auth_manager.login(callback=self.on_login_complete)
         
+        # Login can block for minutes waiting on the browser, so it gets its own
+        # daemon thread rather than tying up a pool worker or delaying exit
         threading.Thread(target=login_thread, daemon=True).start()
     
     def on_login_complete(self, success: bool, message: str):
@@ -306,9 +402,10 @@ class YachtEmailReaderApp:
                 self.logout_button.config(state=tk.NORMAL)
                 self.search_button.config(state=tk.NORMAL)
                 self.clear_button.config(state=tk.NORMAL)
+                self._create_filter_widgets()
                 
                 # Load user info
-                threading.Thread(target=self.load_user_info, daemon=True).start()
+                self._submit(self.load_user_info())
             else:
                 self.update_status(f"Login failed: {message}", success=False)
                 self.login_button.config(state=tk.NORMAL, text="Login to Microsoft")
@@ -320,29 +417,46 @@ class YachtEmailReaderApp:
     def handle_logout(self):
         """Handle logout button click"""
         if self.auth_manager.logout():
+            self.graph_client.invalidate_token()  # Don't reuse the old account's token
             self.update_status("Logged out", success=True)
             self.login_button.config(state=tk.NORMAL)
             self.logout_button.config(state=tk.DISABLED)
             self.search_button.config(state=tk.DISABLED)
             self.clear_button.config(state=tk.DISABLED)
             self.user_label.config(text="")
+            self.user_info = None
+            with self._details_cache_lock:
+                self._details_cache.clear()
             self.clear_results()
         else:
             messagebox.showerror("Logout Error", "Failed to logout")
     
-    def load_user_info(self):
+    def _submit(self, coro):
+        """Schedule a coroutine on the Graph event loop from the Tk thread"""
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+    
+    async def load_user_info(self):
         """Load user profile information"""
         try:
-            self.user_info = self.graph_client.get_user_profile()
+            if self.user_info is None:
+                self.user_info = await self.graph_client.get_user_profile_async()
             user_text = f"Welcome, {self.user_info['displayName']} ({self.user_info['mail']})"
             self.root.after(0, lambda: self.user_label.config(text=user_text))
         except Exception as e:
-            logger.error(f"Failed to load user info: {str(e)}")
+            logger.error("Failed to load user info: %s", e)
             self.root.after(0, lambda: self.user_label.config(text="Failed to load user info"))
     
+    def _request_search(self):
+        """Debounce search requests so only the last one in a burst runs"""
+        if self._search_after_id is not None:
+            self.root.after_cancel(self._search_after_id)
+        self._search_after_id = self.root.after(SEARCH_DEBOUNCE_MS, self.handle_search)
+    
     def handle_search(self):
         """Handle search button click"""
+        self._search_after_id = None
         search_query = self.search_var.get().strip()
+        self._create_filter_widgets()
         
         try:
             days_back = int(self.days_var.get()) if self.days_var.get().strip() else None
@@ -354,26 +468,45 @@ class YachtEmailReaderApp:
         self.update_status("Searching emails...")
         self.search_button.config(state=tk.DISABLED, text="Searching...")
         
-        def search_thread():
+        # Supersede any search still queued or in flight
+        if self._search_future is not None:
+            self._search_future.cancel()
+        self._search_generation += 1
+        generation = self._search_generation
+        
+        async def search_task():
             try:
-                emails = self.graph_client.search_emails(
+                emails = await self.graph_client.search_emails_async(
                     search_query=search_query if search_query else None,
                     days_back=days_back,
                     max_results=max_results
                 )
+                if generation != self._search_generation:
+                    return  # A newer search owns the results pane
                 
-                self.root.after(0, lambda: self.display_emails(emails))
-                self.root.after(0, lambda: self.update_status(f"Found {len(emails)} emails"))
+                # Date formatting is CPU-bound, keep it off the event loop
+                rows = await asyncio.to_thread(build_email_rows, emails)
+                self.root.after(0, self._finish_search, generation, emails, rows)
                 
             except Exception as e:
-                error_msg = f"Search failed: {str(e)}"
+                error_msg = f"Search failed: {e}"
                 logger.error(error_msg)
-                self.root.after(0, lambda: self.update_status(error_msg, success=False))
-                self.root.after(0, lambda: messagebox.showerror("Search Error", error_msg))
-            finally:
-                self.root.after(0, lambda: self.search_button.config(state=tk.NORMAL, text="Search"))
+                self.root.after(0, self._finish_search, generation, None, None, error_msg)
         
-        threading.Thread(target=search_thread, daemon=True).start()
+        self._search_future = self._submit(search_task())
+    
+    def _finish_search(self, generation: int, emails: Optional[List[Dict[str, Any]]],
+                       rows: Optional[List[tuple]], error_msg: Optional[str] = None):
+        """Apply a search result to the UI in a single main-loop callback"""
+        if generation != self._search_generation:
+            return  # Superseded by a newer search, which will re-enable the button
+        
+        if error_msg is None:
+            self.display_emails(emails, rows)
+            self.update_status(f"Found {len(emails)} emails")
+        else:
+            self._report_error("Search Error", error_msg)
+        self.search_button.config(state=tk.NORMAL, text="Search")
     
     def handle_clear(self):
         """Handle clear button click"""
@@ -381,42 +514,125 @@ class YachtEmailReaderApp:
         self.clear_results()
         self.update_status("Results cleared")
     
-    def display_emails(self, emails: List[Dict[str, Any]]):
+    def display_emails(self, emails: List[Dict[str, Any]], rows: Optional[List[tuple]] = None):
         """Display email results in the tree view"""
-        self.current_emails = emails
         self.clear_results()
+        self.current_emails = emails
+        self._email_rows = rows if rows is not None else build_email_rows(emails)
+        self._scroll_to(0)
+    
+    def _visible_rows(self) -> int:
+        """Number of rows that fit in the tree viewport"""
+        row_height = int(ttk.Style().lookup('Treeview', 'rowheight') or 20)
+        height = self.email_tree.winfo_height()
+        if height <= 1:  # Not yet mapped
+            return EMAIL_LIST_HEIGHT
+        return max(height // row_height - 1, 1)  # Minus the heading row
+    
+    def _render_window(self, first: int, last: int):
+        """Realize tree rows for current_emails[first:last] and drop the rest"""
+        tree = self.email_tree
+        old_first, old_last = self._rendered
+        keep_first, keep_last = max(first, old_first), min(last, old_last)
+        
+        if keep_first >= keep_last:
+            # No overlap with the previous window - start over
+            stale = tree.get_children()
+            keep_first = keep_last = first
+        else:
+            stale = [str(i) for i in range(old_first, keep_first)]
+            stale += [str(i) for i in range(keep_last, old_last)]
         
-        for i, email in enumerate(emails):
-            self.email_tree.insert(
-                '',
-                'end',
-                text=str(i + 1),
-                values=(
-                    email['subject'][:50] + '...' if len(email['subject']) > 50 else email['subject'],
-                    email['from'][:30] + '...' if len(email['from']) > 30 else email['from'],
-                    email['receivedDateTime'],
-                    'Yes' if email['isRead'] else 'No'
-                )
-            )
+        # Rows entering above the kept range, then below it
+        email_rows = self._email_rows
+        rows = [(i - first, i) for i in range(first, keep_first)]
+        rows += [('end', i) for i in range(keep_last, last)]
+        
+        # Hide columns while the batch is applied so Tk relayouts once
+        tree.configure(displaycolumns=())
+        try:
+            if stale:
+                tree.delete(*stale)
+            _ins = tree.insert
+            for index, i in rows:
+                text, values = email_rows[i]
+                _ins('', index, iid=str(i), text=text, values=values)
+        finally:
+            tree.configure(displaycolumns='#all')
+        
+        self._rendered = (first, last)
+    
+    def _scroll_to(self, first: int):
+        """Move the virtual window so that row `first` is at the top"""
+        total = len(self.current_emails)
+        visible = self._visible_rows()
+        first = max(0, min(first, total - visible))
+        last = min(first + visible + RENDER_BUFFER, total)
+        
+        self._render_window(first, last)
+        self.email_tree.yview_moveto(0)
+        
+        if total:
+            self.email_scrollbar.set(first / total, min(first + visible, total) / total)
+        else:
+            self.email_scrollbar.set(0, 1)
+    
+    def _scroll_by(self, rows: int):
+        """Scroll the virtual window by a number of rows"""
+        self._scroll_to(self._rendered[0] + rows)
+        return 'break'
+    
+    def _on_scrollbar(self, action: str, amount: str, unit: str = None):
+        """Translate scrollbar commands into virtual window moves"""
+        if action == 'moveto':
+            self._scroll_to(int(float(amount) * len(self.current_emails)))
+        elif action == 'scroll':
+            step = self._visible_rows() if unit == 'pages' else 1
+            self._scroll_by(int(amount) * step)
+    
+    def _on_mouse_wheel(self, event):
+        """Handle mouse wheel scrolling on Windows/macOS"""
+        return self._scroll_by(-1 if event.delta > 0 else 1)
+    
+    def _on_arrow_key(self, direction: int):
+        """Shift the virtual window when keyboard navigation reaches its edge"""
+        focus = self.email_tree.focus()
+        if not focus:
+            return None
+        
+        target = int(focus) + direction
+        first = self._rendered[0]
+        visible = self._visible_rows()
+        if not 0 <= target < len(self.current_emails):
+            return 'break'
+        if first <= target < first + visible:
+            return None  # Let the Treeview move the selection natively
+        
+        self._scroll_to(target - visible + 1 if direction > 0 else target)
+        self.email_tree.selection_set(str(target))
+        self.email_tree.focus(str(target))
+        return 'break'
     
     def clear_results(self):
         """Clear all results from the display"""
-        for item in self.email_tree.get_children():
-            self.email_tree.delete(item)
+        children = self.email_tree.get_children()
+        if children:
+            self.email_tree.delete(*children)
+        self._rendered = (0, 0)
+        self.email_scrollbar.set(0, 1)
         
-        self.details_text.config(state=tk.NORMAL)
-        self.details_text.delete(1.0, tk.END)
-        self.details_text.config(state=tk.DISABLED)
+        if hasattr(self, 'details_text'):
+            self.details_text.delete('1.0', 'end')
         
         self.current_emails = []
+        self._email_rows = []
         self.selected_email = None
     
     def on_email_select(self, event):
         """Handle email selection in tree view"""
         selection = self.email_tree.selection()
         if selection:
-            item = self.email_tree.item(selection[0])
-            email_index = int(item['text']) - 1
+            email_index = int(selection[0])  # Rows are inserted with iid=str(index)
             
             if 0 <= email_index < len(self.current_emails):
                 email = self.current_emails[email_index]
@@ -426,8 +642,7 @@ class YachtEmailReaderApp:
         """Handle double-click on email for full details"""
         selection = self.email_tree.selection()
         if selection:
-            item = self.email_tree.item(selection[0])
-            email_index = int(item['text']) - 1
+            email_index = int(selection[0])  # Rows are inserted with iid=str(index)
             
             if 0 <= email_index < len(self.current_emails):
                 email = self.current_emails[email_index]
@@ -447,54 +662,74 @@ Preview:
 
 (Double-click email to view full content)"""
         
-        self.details_text.config(state=tk.NORMAL)
-        self.details_text.delete(1.0, tk.END)
-        self.details_text.insert(1.0, preview_text)
-        self.details_text.config(state=tk.DISABLED)
+        self._create_details_widgets()
+        self.details_text.delete('1.0', 'end')
+        self.details_text.insert('1.0', preview_text)
     
     def load_email_details(self, message_id: str):
         """Load and display full email details"""
+        with self._details_cache_lock:
+            cached = self._details_cache.get(message_id)
+            if cached is not None:
+                self._details_cache.move_to_end(message_id)
+        if cached is not None:
+            self._finish_email_details(cached)
+            return
+        
         self.update_status("Loading email details...")
         
-        def load_thread():
+        async def load_task():
             try:
-                email_details = self.graph_client.get_email_details(message_id)
-                self.root.after(0, lambda: self.show_email_details(email_details))
-                self.root.after(0, lambda: self.update_status("Email details loaded"))
+                email_details = await self.graph_client.get_email_details_async(message_id)
+                with self._details_cache_lock:
+                    self._details_cache[message_id] = email_details
+                    if len(self._details_cache) > DETAILS_CACHE_SIZE:
+                        self._details_cache.popitem(last=False)
+                self.root.after(0, self._finish_email_details, email_details)
                 
             except Exception as e:
-                error_msg = f"Failed to load email details: {str(e)}"
+                error_msg = f"Failed to load email details: {e}"
                 logger.error(error_msg)
-                self.root.after(0, lambda: self.update_status(error_msg, success=False))
-                self.root.after(0, lambda: messagebox.showerror("Load Error", error_msg))
+                self.root.after(0, self._finish_email_details, None, error_msg)
         
-        threading.Thread(target=load_thread, daemon=True).start()
+        self._submit(load_task())
+    
+    def _finish_email_details(self, email_details: Optional[Dict[str, Any]], error_msg: Optional[str] = None):
+        """Apply loaded email details to the UI in a single main-loop callback"""
+        if error_msg is None:
+            self.show_email_details(email_details)
+            self.update_status("Email details loaded")
+        else:
+            self._report_error("Load Error", error_msg)
     
     def show_email_details(self, email: Dict[str, Any]):
         """Show full email details"""
-        details_text = f"""Subject: {email['subject']}
-From: {email['from']}
-To: {', '.join(email['to'])}"""
+        parts = [
+            f"Subject: {email['subject']}",
+            f"From: {email['from']}",
+            f"To: {', '.join(email['to'])}",
+        ]
         
         if email['cc']:
-            details_text += f"\nCC: {', '.join(email['cc'])}"
+            parts.append(f"CC: {', '.join(email['cc'])}")
         
-        details_text += f"""
-Sent: {email['sentDateTime']}
-Received: {email['receivedDateTime']}
-Read: {'Yes' if email['isRead'] else 'No'}
-Importance: {email['importance']}
-Has Attachments: {'Yes' if email['hasAttachments'] else 'No'}"""
+        parts.append(f"Sent: {email['sentDateTime']}")
+        parts.append(f"Received: {email['receivedDateTime']}")
+        parts.append(f"Read: {'Yes' if email['isRead'] else 'No'}")
+        parts.append(f"Importance: {email['importance']}")
+        parts.append(f"Has Attachments: {'Yes' if email['hasAttachments'] else 'No'}")
         
         if email['categories']:
-            details_text += f"\nCategories: {', '.join(email['categories'])}"
+            parts.append(f"Categories: {', '.join(email['categories'])}")
         
-        details_text += f"\n\n--- Email Body ---\n{email['body']}"
+        # Body is appended last so the large string is copied only once, by join
+        parts.append("")
+        parts.append("--- Email Body ---")
+        parts.append(email['body'])
         
-        self.details_text.config(state=tk.NORMAL)
-        self.details_text.delete(1.0, tk.END)
-        self.details_text.insert(1.0, details_text)
-        self.details_text.config(state=tk.DISABLED)
+        self._create_details_widgets()
+        self.details_text.delete('1.0', 'end')
+        self.details_text.insert('1.0', '\n'.join(parts))
     
     def run(self):
         """Start the application"""
@@ -509,6 +744,9 @@ Has Attachments: {'Yes' if email['hasAttachments'] else 'No'}"""
     def on_closing(self):
         """Handle application closing"""
         logger.info("Application closing")
+        # Close the HTTP client on its own loop, then stop the loop thread
+        closing = self._submit(self.graph_client.aclose())
+        closing.add_done_callback(lambda _: self._loop.call_soon_threadsafe(self._loop.stop))
         self.root.destroy()
 
 def main():
@@ -517,7 +755,7 @@ def main():
         app = YachtEmailReaderApp()
         app.run()
     except Exception as e:
-        logger.error(f"Application error: {str(e)}")
+        logger.error("Application error: %s", e)
         messagebox.showerror("Application Error", f"Failed to start application: {str(e)}")
 
 if __name__ == "__main__":
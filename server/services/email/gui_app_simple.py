@@ -4,8 +4,10 @@ Using basic Tkinter widgets for better compatibility
 """
 
 import tkinter as tk
-from tkinter import messagebox, scrolledtext
+from tkinter import ttk, messagebox, scrolledtext
+import asyncio
 import threading
+import time
 import logging
 from typing import List, Dict, Any, Optional
 from config import APP_NAME, WINDOW_WIDTH, WINDOW_HEIGHT, validate_config
@@ -51,6 +53,15 @@ class YachtEmailReaderApp:
             self.root.destroy()
             return
         
+        # Graph calls run as coroutines on one background event loop
+        self._loop = asyncio.new_event_loop()
+        threading.Thread(target=self._loop.run_forever, name='graph-loop', daemon=True).start()
+        self._search_future = None
+        self._search_generation = 0  # Bumped per search; stale pages are dropped
+        self._shown_generation = 0  # Search whose results are in the table
+        self._auth_dirty = False  # An auth state refresh is scheduled, see check_auth_status
+        self._token_expires_at = 0  # Epoch expiry of the stored access token, 0 if unknown
+        
         # Application state
         self.user_info = None
         self.current_emails = []
@@ -152,12 +163,24 @@ class YachtEmailReaderApp:
                                 bg='white')
         results_title.pack(pady=5)
         
-        # Simple text area for results (replacing complex treeview)
-        self.results_text = scrolledtext.ScrolledText(results_frame, 
-                                                     height=10, width=80,
-                                                     font=('Courier', 10),
-                                                     state='disabled')
-        self.results_text.pack(fill='both', expand=True, padx=5, pady=5)
+        # One row per email; Tk only draws the rows in view, however many results
+        self.results_tree = ttk.Treeview(results_frame, 
+                                         columns=('subject', 'from', 'date', 'read'),
+                                         show='headings', height=10)
+        self.results_tree.heading('subject', text='Subject')
+        self.results_tree.heading('from', text='From')
+        self.results_tree.heading('date', text='Date')
+        self.results_tree.heading('read', text='Read')
+        self.results_tree.column('subject', width=320)
+        self.results_tree.column('from', width=200)
+        self.results_tree.column('date', width=140)
+        self.results_tree.column('read', width=50, anchor='center')
+        
+        results_scrollbar = tk.Scrollbar(results_frame, orient='vertical', 
+                                         command=self.results_tree.yview)
+        self.results_tree.configure(yscrollcommand=results_scrollbar.set)
+        results_scrollbar.pack(side='right', fill='y', pady=5)
+        self.results_tree.pack(fill='both', expand=True, padx=5, pady=5)
         
         # Email Details Section
         details_frame = tk.Frame(self.root, bg='white', relief='sunken', bd=2)
@@ -184,9 +207,17 @@ class YachtEmailReaderApp:
         self.status_bar.pack(fill='x', padx=5, pady=2)
     
     def check_auth_status(self):
+        """Schedule an auth status refresh, coalescing bursts into one per 100ms"""
+        if not self._auth_dirty:
+            self._auth_dirty = True
+            self.root.after(100, self._flush_auth_state)
+    
+    def _flush_auth_state(self):
         """Check and update authentication status"""
+        self._auth_dirty = False
         try:
             if hasattr(self, 'auth_manager') and self.auth_manager.is_authenticated():
+                self._token_expires_at = self._read_token_expiry()
                 self.update_status("Authenticated", success=True)
                 self.login_button.config(state='disabled')
                 self.logout_button.config(state='normal')
@@ -194,7 +225,7 @@ class YachtEmailReaderApp:
                 self.clear_button.config(state='normal')
                 
                 # Get user info
-                threading.Thread(target=self.load_user_info, daemon=True).start()
+                self._submit(self.load_user_info())
             else:
                 self.update_status("Not authenticated", success=False)
                 self.login_button.config(state='normal')
@@ -213,6 +244,15 @@ class YachtEmailReaderApp:
         )
         self.status_var.set(message)
     
+    def _read_token_expiry(self) -> float:
+        """Expiry time of the stored access token, or 0 if unknown"""
+        tokens = self.auth_manager.token_manager.get_tokens()
+        return tokens.get('expires_at', 0) if tokens else 0
+    
+    def _submit(self, coro):
+        """Schedule a coroutine on the Graph event loop from the Tk thread"""
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+    
     def handle_login(self):
         """Handle login button click"""
         self.update_status("Authenticating...")
@@ -221,10 +261,16 @@ class YachtEmailReaderApp:
         def login_thread():
             success = self.auth_manager.login(callback=self.on_login_complete)
         
+        # Login can block for minutes waiting on the browser, so it keeps its own
+        # daemon thread rather than an executor thread that would delay exit
         threading.Thread(target=login_thread, daemon=True).start()
     
     def on_login_complete(self, success: bool, message: str):
         """Callback for login completion"""
+        if success:
+            # Still on the login thread, so the keychain read stays off the UI
+            self._token_expires_at = self._read_token_expiry()
+        
         def update_ui():
             if success:
                 self.update_status("Authenticated", success=True)
@@ -234,7 +280,7 @@ class YachtEmailReaderApp:
                 self.clear_button.config(state='normal')
                 
                 # Load user info
-                threading.Thread(target=self.load_user_info, daemon=True).start()
+                self._submit(self.load_user_info())
             else:
                 self.update_status(f"Login failed: {message}", success=False)
                 self.login_button.config(state='normal', text="Login to Microsoft")
@@ -246,26 +292,28 @@ class YachtEmailReaderApp:
     def handle_logout(self):
         """Handle logout button click"""
         if self.auth_manager.logout():
+            self.graph_client.invalidate_token()  # Don't reuse the old account's token
             self.update_status("Logged out", success=True)
             self.login_button.config(state='normal')
             self.logout_button.config(state='disabled')
             self.search_button.config(state='disabled')
             self.clear_button.config(state='disabled')
             self.user_label.config(text="")
+            self._token_expires_at = 0
             self.clear_results()
         else:
             messagebox.showerror("Logout Error", "Failed to logout")
     
-    def load_user_info(self):
+    async def load_user_info(self):
         """Load user profile information"""
         try:
-            self.user_info = self.graph_client.get_user_profile()
+            self.user_info = await self.graph_client.get_user_profile_async()
             user_text = f"Welcome, {self.user_info['displayName']} ({self.user_info['mail']})"
             self.root.after(0, lambda: self.user_label.config(text=user_text))
         except Exception as e:
             logger.error(f"Failed to load user info: {str(e)}")
             if "Authentication expired" in str(e):
-                self.root.after(0, lambda: self.check_auth_status())  # Update auth status
+                self.root.after(0, self.check_auth_status)  # Update auth status
             else:
                 self.root.after(0, lambda: self.user_label.config(text="Failed to load user info"))
     
@@ -277,67 +325,101 @@ class YachtEmailReaderApp:
             messagebox.showwarning("No Search Term", "Please enter a search term")
             return
         
-        # Validate authentication before searching
-        if not self.auth_manager.is_authenticated():
-            messagebox.showerror("Not Authenticated", "Please login first before searching")
-            return
+        # Validate authentication before searching; a token known to be fresh
+        # skips the keychain lookup behind is_authenticated()
+        if time.time() >= self._token_expires_at - 60:
+            if not self.auth_manager.is_authenticated():
+                messagebox.showerror("Not Authenticated", "Please login first before searching")
+                return
+            # is_authenticated() may have refreshed the token; pick up its expiry
+            self._token_expires_at = self._read_token_expiry()
         
         self.update_status("Searching emails...")
         self.search_button.config(state='disabled', text="Searching...")
         
-        def search_thread():
+        # Only the latest search may update the results
+        if self._search_future is not None:
+            self._search_future.cancel()
+        self._search_generation += 1
+        generation = self._search_generation
+        
+        async def search_task():
             try:
-                # Get days back and max results from UI (add these controls if needed)
-                try:
-                    days_back = 30  # Default value
-                    max_results = 25  # Reduced for faster loading
-                except ValueError:
-                    days_back = 30
-                    max_results = 25
-                
-                emails = self.graph_client.search_emails(
+                # Pages are shown as they arrive, so the first results appear
+                # after one small round trip instead of the whole result set
+                async for batch in self.graph_client.search_email_pages_async(
                     search_query=search_query, 
-                    days_back=days_back, 
-                    max_results=max_results
-                )
-                self.current_emails = emails
-                self.root.after(0, lambda: self.display_search_results(emails))
-                self.root.after(0, lambda: self.update_status(f"Found {len(emails)} emails"))
+                    days_back=30,  # Default value
+                    max_results=25,
+                    page_size=10
+                ):
+                    self.root.after(0, self._append_results, generation, batch)
+                self.root.after(0, self._finish_search, generation)
                 
             except Exception as e:
                 error_msg = str(e)
                 logger.error(f"Search failed: {error_msg}")
-                self.root.after(0, lambda: self.update_status(error_msg, success=False))
-                
-                # Handle specific error types
-                if "Authentication expired" in error_msg:
-                    self.root.after(0, lambda: self.check_auth_status())  # Update auth status
-                    self.root.after(0, lambda: messagebox.showerror("Authentication Error", 
-                                                                   "Your session has expired. Please login again."))
-                else:
-                    self.root.after(0, lambda: messagebox.showerror("Search Error", error_msg))
-            finally:
-                self.root.after(0, lambda: self.search_button.config(state='normal', text="Search"))
-        
-        threading.Thread(target=search_thread, daemon=True).start()
-    
-    def display_search_results(self, emails: List[Dict[str, Any]]):
-        """Display search results in simple text format"""
-        self.results_text.config(state='normal')
-        self.results_text.delete(1.0, tk.END)
+                self.root.after(0, self._finish_search, generation, error_msg)
         
-        if not emails:
-            self.results_text.insert(tk.END, "No emails found.\n")
+        self._search_future = self._submit(search_task())
+    
+    def _append_results(self, generation: int, batch: List[Dict[str, Any]]):
+        """Show one page of search results as it arrives"""
+        if generation != self._search_generation:
+            return  # Page from a superseded search
+        
+        if self._shown_generation != generation:
+            # First page replaces the previous search's results
+            self._shown_generation = generation
+            self.current_emails = []
+            self.display_search_results(batch)
+        else:
+            self._insert_result_rows(len(self.current_emails), batch)
+        self.current_emails.extend(batch)
+        self.update_status(f"Loaded {len(self.current_emails)} emails...")
+    
+    def _finish_search(self, generation: int, error_msg: Optional[str] = None):
+        """Finish a search once all pages have arrived or it failed"""
+        if generation != self._search_generation:
+            return  # Superseded by a newer search, which will re-enable the button
+        
+        if error_msg is None:
+            if self._shown_generation != generation:
+                # No results at all - drop the previous search's
+                self._shown_generation = generation
+                self.current_emails = []
+                self.display_search_results([])
+            self.update_status(f"Found {len(self.current_emails)} emails")
         else:
-            self.results_text.insert(tk.END, f"Found {len(emails)} emails:\n\n")
-            for i, email in enumerate(emails, 1):
-                result_line = f"{i}. {email['subject']}\n"
-                result_line += f"   From: {email['from']}\n"
-                result_line += f"   Date: {email['receivedDateTime']}\n"
-                result_line += f"   Read: {'Yes' if email['isRead'] else 'No'}\n\n"
-                self.results_text.insert(tk.END, result_line)
-        
-        self.results_text.config(state='disabled')
+            self.update_status(error_msg, success=False)
+            
+            # Handle specific error types
+            if "Authentication expired" in error_msg:
+                self._token_expires_at = 0
+                self.check_auth_status()  # Update auth status
+                messagebox.showerror("Authentication Error", 
+                                     "Your session has expired. Please login again.")
+            else:
+                messagebox.showerror("Search Error", error_msg)
+        self.search_button.config(state='normal', text="Search")
+    
+    def display_search_results(self, emails: List[Dict[str, Any]]):
+        """Display search results in the results table"""
+        children = self.results_tree.get_children()
+        if children:
+            self.results_tree.delete(*children)
+        self._insert_result_rows(0, emails)
+    
+    def _insert_result_rows(self, start: int, emails: List[Dict[str, Any]]):
+        """Append table rows for emails, using their current_emails index as iid"""
+        insert = self.results_tree.insert
+        for i, email in enumerate(emails, start):
+            insert('', 'end', iid=str(i), values=(
+                email['subject'],
+                email['from'],
+                email['receivedDateTime'],
+                'Yes' if email['isRead'] else 'No'
+            ))
     
     def handle_clear(self):
         """Clear search results"""
@@ -347,9 +429,9 @@ class YachtEmailReaderApp:
     
     def clear_results(self):
         """Clear results and details"""
-        self.results_text.config(state='normal')
-        self.results_text.delete(1.0, tk.END)
-        self.results_text.config(state='disabled')
+        children = self.results_tree.get_children()
+        if children:
+            self.results_tree.delete(*children)
         
         self.details_text.config(state='normal')
         self.details_text.delete(1.0, tk.END)
@@ -371,6 +453,9 @@ class YachtEmailReaderApp:
     def on_closing(self):
         """Handle application closing"""
         logger.info("Application closing")
+        # Close the HTTP client on its own loop, then stop the loop thread
+        closing = self._submit(self.graph_client.aclose())
+        closing.add_done_callback(lambda _: self._loop.call_soon_threadsafe(self._loop.stop))
         self.root.destroy()
 
 def main():
@@ -144,6 +144,20 @@ copy_files() {
     log_success "Application files copied"
 }
 
+# Precompile bytecode so startup doesn't recompile every module, which it
+# would otherwise do on each launch when the install directory isn't writable
+compile_bytecode() {
+    log_info "Precompiling Python bytecode..."
+    
+    if [[ $USER_INSTALL == true ]]; then
+        python3 -m compileall -q "$INSTALL_DIR"
+    else
+        sudo python3 -m compileall -q "$INSTALL_DIR"
+    fi
+    
+    log_success "Bytecode compiled"
+}
+
 # Create launcher script
 create_launcher() {
     log_info "Creating launcher script..."
@@ -305,6 +319,7 @@ main() {
     check_permissions
     create_install_directory
     copy_files
+    compile_bytecode
     install_dependencies
     create_launcher
     create_app_bundle
@@ -2,15 +2,23 @@
 """
 Multi-User REST API Server for n8n Email Search Integration
 Handles multiple users with individual bearer tokens
+
+Run under gunicorn for concurrent requests (see Procfile):
+    gunicorn -k gthread -w 1 --threads 32 -b localhost:8001 multi_user_api_server:app
+
+Use a single worker: the token and Graph client caches are per process, so
+a re-registration handled by one worker would leave others serving the old
+token.
 """
 
 import os
 import sys
-from flask import Flask, request, jsonify
-from flask_cors import CORS
+from flask import Flask, request
+from flask.json.provider import DefaultJSONProvider
 import logging
-from datetime import datetime, timezone
-import traceback
+import orjson
+from collections import OrderedDict
+from datetime import datetime
 import json
 import sqlite3
 from threading import Lock
@@ -22,6 +30,7 @@ from auth_manager import AuthManager
 from graph_client import GraphClient
 from token_manager import TokenManager
 from config import validate_config
+from api_utils import now_iso, ojsonify
 
 # Setup logging
 logging.basicConfig(
@@ -30,19 +39,70 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+class OrjsonProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson, used for request parsing and jsonify"""
+    
+    def dumps(self, obj, **kwargs) -> str:
+        return orjson.dumps(obj).decode()
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+class CORSMiddleware:
+    """WSGI middleware adding a fixed set of CORS headers to every response"""
+    
+    HEADERS = (
+        ('Access-Control-Allow-Origin', '*'),
+        ('Access-Control-Allow-Headers', 'Content-Type, Authorization'),
+        ('Access-Control-Allow-Methods', 'GET, POST, OPTIONS'),
+    )
+    
+    def __init__(self, wsgi_app):
+        self.wsgi_app = wsgi_app
+    
+    def __call__(self, environ, start_response):
+        def cors_start_response(status, headers, exc_info=None):
+            headers.extend(self.HEADERS)
+            return start_response(status, headers, exc_info)
+        return self.wsgi_app(environ, cors_start_response)
+
 # Initialize Flask app
 app = Flask(__name__)
-CORS(app)
+app.json = OrjsonProvider(app)
+app.wsgi_app = CORSMiddleware(app.wsgi_app)
 
 # Database for user tokens
 DB_LOCK = Lock()
 DB_PATH = "user_tokens.db"
 
-def init_database():
-    """Initialize SQLite database for user token storage"""
-    with sqlite3.connect(DB_PATH) as conn:
-        cursor = conn.cursor()
-        cursor.execute('''
+_conn = None  # Shared connection, always used under DB_LOCK
+
+# Process-local cache of valid tokens (user_id -> token info), so the search
+# hot path skips SQLite. Entries are served until shortly before expiry and are
+# only written under DB_LOCK, so a read can't re-cache a token being replaced.
+_TOKEN_CACHE = {}
+TOKEN_CACHE_MARGIN = 30  # Seconds
+
+_UPSERT_TOKEN_SQL = '''
+    INSERT OR REPLACE INTO user_tokens 
+    (user_id, user_email, access_token, refresh_token, expires_at, created_at, updated_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+'''
+
+# Fixed statement text so sqlite3's per-connection statement cache reuses the compiled query
+_SELECT_STMT = "SELECT access_token, refresh_token, expires_at, user_email FROM user_tokens WHERE user_id = ?"
+_SELECT_EXPIRY_STMT = "SELECT expires_at FROM user_tokens WHERE user_id = ?"
+
+def _get_connection() -> sqlite3.Connection:
+    """Get the shared token store connection, opening it on first use (caller holds DB_LOCK)"""
+    global _conn
+    if _conn is None:
+        # Autocommit mode; multi-row writes use explicit BEGIN/COMMIT. WAL with
+        # synchronous=NORMAL avoids an fsync per committed token.
+        conn = sqlite3.connect(DB_PATH, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute('''
             CREATE TABLE IF NOT EXISTS user_tokens (
                 user_id TEXT PRIMARY KEY,
                 user_email TEXT,
@@ -53,59 +113,140 @@ def init_database():
                 updated_at INTEGER
             )
         ''')
-        conn.commit()
+        _conn = conn
+    return _conn
+
+class UserTokenAuth:
+    """Hands GraphClient a user's registered bearer token in place of an AuthManager"""
+    
+    def __init__(self, access_token: str):
+        self.access_token = access_token
+    
+    def get_access_token(self) -> str:
+        return self.access_token
+
+GRAPH_CLIENT_CACHE_SIZE = 256  # Users whose Graph clients are kept, least recently used closed
+_GRAPH_CLIENTS = OrderedDict()  # user_id -> GraphClient bound to that user's current token, LRU order
+_GRAPH_CLIENTS_LOCK = Lock()
+
+def get_graph_client(user_id: str, access_token: str) -> GraphClient:
+    """Get a Graph client for a user, reusing its connection pool while the token is unchanged"""
+    stale = []
+    with _GRAPH_CLIENTS_LOCK:
+        client = _GRAPH_CLIENTS.get(user_id)
+        if client is None or client.auth_manager.access_token != access_token:
+            if client is not None:
+                stale.append(client)
+            client = GraphClient(UserTokenAuth(access_token))
+            _GRAPH_CLIENTS[user_id] = client
+        _GRAPH_CLIENTS.move_to_end(user_id)
+        while len(_GRAPH_CLIENTS) > GRAPH_CLIENT_CACHE_SIZE:
+            stale.append(_GRAPH_CLIENTS.popitem(last=False)[1])
+    
+    # Release replaced and evicted clients' connection pools outside the lock
+    for old_client in stale:
+        old_client.close()
+    return client
+
+def init_database():
+    """Initialize SQLite database for user token storage"""
+    with DB_LOCK:
+        _get_connection()
+
+def _token_row(user_id: str, user_email: str, token_data: dict, now: int) -> tuple:
+    """Build the user_tokens row for a token"""
+    expires_at = now + token_data.get('expires_in', 3600)
+    return (
+        user_id, user_email,
+        token_data.get('access_token'),
+        token_data.get('refresh_token'),
+        expires_at, now, now
+    )
 
 def store_user_token(user_id: str, user_email: str, token_data: dict):
     """Store user-specific bearer token"""
+    now = int(datetime.now().timestamp())
+    row = _token_row(user_id, user_email, token_data, now)
     with DB_LOCK:
-        with sqlite3.connect(DB_PATH) as conn:
-            cursor = conn.cursor()
-            now = int(datetime.now().timestamp())
-            expires_at = now + token_data.get('expires_in', 3600)
-            
-            cursor.execute('''
-                INSERT OR REPLACE INTO user_tokens 
-                (user_id, user_email, access_token, refresh_token, expires_at, created_at, updated_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                user_id, user_email,
-                token_data.get('access_token'),
-                token_data.get('refresh_token'),
-                expires_at, now, now
-            ))
-            conn.commit()
-            logger.info(f"Stored token for user {user_id} ({user_email})")
+        _get_connection().execute(_UPSERT_TOKEN_SQL, row)
+        _TOKEN_CACHE.pop(user_id, None)
+    logger.info(f"Stored token for user {user_id} ({user_email})")
+
+def store_user_tokens(tokens: list):
+    """
+    Store many user tokens in a single transaction
+    
+    Args:
+        tokens: List of (user_id, user_email, token_data) tuples
+    """
+    now = int(datetime.now().timestamp())
+    rows = [_token_row(user_id, user_email, token_data, now)
+            for user_id, user_email, token_data in tokens]
+    with DB_LOCK:
+        conn = _get_connection()
+        conn.execute("BEGIN")
+        try:
+            conn.executemany(_UPSERT_TOKEN_SQL, rows)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        for row in rows:
+            _TOKEN_CACHE.pop(row[0], None)
+    logger.info(f"Stored tokens for {len(rows)} users")
 
 def get_user_token(user_id: str) -> dict:
     """Retrieve user-specific bearer token"""
+    now = int(datetime.now().timestamp())
+    cached = _TOKEN_CACHE.get(user_id)
+    if cached is not None and now < cached['expires_at'] - TOKEN_CACHE_MARGIN:
+        return cached
+    
     with DB_LOCK:
-        with sqlite3.connect(DB_PATH) as conn:
-            cursor = conn.cursor()
-            cursor.execute('''
-                SELECT access_token, refresh_token, expires_at, user_email
-                FROM user_tokens WHERE user_id = ?
-            ''', (user_id,))
-            row = cursor.fetchone()
+        row = _get_connection().execute(_SELECT_STMT, (user_id,)).fetchone()
+        
+        if row:
+            access_token, refresh_token, expires_at, user_email = row
             
-            if row:
-                access_token, refresh_token, expires_at, user_email = row
-                now = int(datetime.now().timestamp())
-                
-                return {
-                    'access_token': access_token,
-                    'refresh_token': refresh_token,
-                    'expires_at': expires_at,
-                    'user_email': user_email,
-                    'is_valid': expires_at > now
-                }
-            return None
+            token_info = {
+                'access_token': access_token,
+                'refresh_token': refresh_token,
+                'expires_at': expires_at,
+                'user_email': user_email,
+                'is_valid': expires_at > now
+            }
+            if now < expires_at - TOKEN_CACHE_MARGIN:
+                _TOKEN_CACHE[user_id] = token_info
+            return token_info
+        return None
+
+def get_token_if_valid(user_id: str) -> dict:
+    """
+    Retrieve a user's bearer token, checking expiry before reading the token itself
+    
+    Returns:
+        None if no token is registered, the full token info (as get_user_token)
+        if it is valid, or just {'expires_at', 'is_valid': False} if it expired
+    """
+    now = int(datetime.now().timestamp())
+    cached = _TOKEN_CACHE.get(user_id)
+    if cached is not None and now < cached['expires_at'] - TOKEN_CACHE_MARGIN:
+        return cached
+    
+    with DB_LOCK:
+        row = _get_connection().execute(_SELECT_EXPIRY_STMT, (user_id,)).fetchone()
+    if row is None:
+        return None
+    if row[0] <= now:
+        return {'expires_at': row[0], 'is_valid': False}
+    return get_user_token(user_id)
 
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
-    return jsonify({
+    return ojsonify({
         "status": "healthy",
-        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "timestamp": now_iso(),
         "message": "Multi-user Email API server is running"
     })
 
@@ -115,7 +256,7 @@ def register_user_token():
     try:
         data = request.get_json()
         if not data:
-            return jsonify({"error": "No JSON data provided"}), 400
+            return ojsonify({"error": "No JSON data provided"}, 400)
             
         user_id = data.get('user_id')
         user_email = data.get('user_email')
@@ -124,10 +265,10 @@ def register_user_token():
         expires_in = data.get('expires_in', 3600)
         
         if not all([user_id, user_email, access_token]):
-            return jsonify({
+            return ojsonify({
                 "error": "Missing required fields",
                 "required": ["user_id", "user_email", "access_token"]
-            }), 400
+            }, 400)
         
         # Store token
         token_data = {
@@ -137,21 +278,72 @@ def register_user_token():
         }
         store_user_token(user_id, user_email, token_data)
         
-        return jsonify({
+        return ojsonify({
             "success": True,
             "message": f"Token registered for user {user_id}",
             "user_email": user_email,
-            "timestamp": datetime.now(timezone.utc).isoformat()
+            "timestamp": now_iso()
         })
         
     except Exception as e:
         logger.error(f"Failed to register user token: {str(e)}")
-        return jsonify({
+        return ojsonify({
             "success": False,
             "error": "Failed to register token",
             "details": str(e),
-            "timestamp": datetime.now(timezone.utc).isoformat()
-        }), 500
+            "timestamp": now_iso()
+        }, 500)
+
+@app.route('/api/auth/register_batch', methods=['POST'])
+def register_user_tokens_batch():
+    """Register bearer tokens for many users in one transaction"""
+    try:
+        data = request.get_json()
+        if not isinstance(data, dict) or not isinstance(data.get('tokens'), list):
+            return ojsonify({"error": "Expected JSON body with a 'tokens' list"}, 400)
+        
+        tokens = []
+        for index, entry in enumerate(data['tokens']):
+            if not isinstance(entry, dict):
+                return ojsonify({
+                    "error": "Each token entry must be a JSON object",
+                    "index": index
+                }, 400)
+            
+            user_id = entry.get('user_id')
+            user_email = entry.get('user_email')
+            access_token = entry.get('access_token')
+            
+            if not all([user_id, user_email, access_token]):
+                return ojsonify({
+                    "error": "Missing required fields",
+                    "index": index,
+                    "required": ["user_id", "user_email", "access_token"]
+                }, 400)
+            
+            tokens.append((user_id, user_email, {
+                'access_token': access_token,
+                'refresh_token': entry.get('refresh_token'),
+                'expires_in': entry.get('expires_in', 3600)
+            }))
+        
+        store_user_tokens(tokens)
+        
+        return ojsonify({
+            "success": True,
+            "message": f"Tokens registered for {len(tokens)} users",
+            "count": len(tokens),
+            "timestamp": now_iso()
+        })
+        
+    except Exception as e:
+        logger.error(f"Failed to register user tokens: {str(e)}")
+        return ojsonify({
+            "success": False,
+            "error": "Failed to register tokens",
+            "details": str(e),
+            "timestamp": now_iso()
+        }, 500)
 
 @app.route('/api/email/search', methods=['POST'])
 def search_user_emails():
@@ -161,135 +353,135 @@ def search_user_emails():
         
         data = request.get_json()
         if not data:
-            return jsonify({"error": "No JSON data provided"}), 400
+            return ojsonify({"error": "No JSON data provided"}, 400)
         
-        # Extract user context
-        user_context = data.get('user_context', {})
+        # Extract user context; a null context gets the 400 below instead of
+        # failing later with a 500 and a logged traceback
+        user_context = data.get('user_context') or {}
         user_id = user_context.get('user_id')
         
         if not user_id or user_id == '[undefined]':
-            return jsonify({
+            return ojsonify({
                 "success": False,
                 "error": "Missing user_id in user_context",
                 "message": "Each request must include user_context.user_id",
-                "timestamp": datetime.now(timezone.utc).isoformat()
-            }), 400
+                "timestamp": now_iso()
+            }, 400)
         
         # Get user's bearer token
-        token_info = get_user_token(user_id)
+        token_info = get_token_if_valid(user_id)
         if not token_info:
-            return jsonify({
+            return ojsonify({
                 "success": False,
                 "error": "User not authenticated",
                 "message": f"No bearer token found for user {user_id}",
-                "timestamp": datetime.now(timezone.utc).isoformat()
-            }), 401
+                "timestamp": now_iso()
+            }, 401)
         
         if not token_info['is_valid']:
-            return jsonify({
+            return ojsonify({
                 "success": False,
                 "error": "Token expired",
                 "message": f"Bearer token expired for user {user_id}",
-                "timestamp": datetime.now(timezone.utc).isoformat()
-            }), 401
+                "timestamp": now_iso()
+            }, 401)
         
-        # Create user-specific Graph client
-        # Note: This would need modification to accept external tokens
-        # For now, simulate the search response
+        user_email = token_info['user_email']
         
         # Extract search parameters
-        query = data.get('query', '').replace('[undefined]', '')
+        query = (data.get('query') or '').replace('[undefined]', '')
         filters = data.get('filters', {})
         top = min(data.get('top', 50), 100)
         
         logger.info(f"Searching emails for user {user_id}: query='{query}', top={top}")
         
-        # Simulate email search (replace with actual Graph API call)
-        mock_emails = [
-            {
-                "id": f"email_{i}",
-                "subject": f"Mock Email {i}: {query}",
-                "from": {"emailAddress": {"address": f"sender{i}@example.com", "name": f"Sender {i}"}},
-                "receivedDateTime": datetime.now(timezone.utc).isoformat(),
-                "bodyPreview": f"This is a mock email containing '{query}' for user {user_id}",
-                "hasAttachments": i % 2 == 0,
-                "importance": "normal",
-                "conversationId": f"conv_{i}"
-            }
-            for i in range(min(top, 5))  # Return up to 5 mock emails
-        ]
+        # Search the user's mailbox with their own token
+        graph_client = get_graph_client(user_id, token_info['access_token'])
+        try:
+            emails = graph_client.list_messages(search_query=query or None, max_results=top)
+        except Exception as e:
+            if "Authentication expired" not in str(e):
+                raise
+            # Microsoft rejected the stored token (expired early or revoked)
+            logger.warning(f"Graph rejected bearer token for user {user_id}")
+            return ojsonify({
+                "success": False,
+                "error": "Token rejected",
+                "message": f"Bearer token for user {user_id} was rejected by Microsoft; re-register to continue",
+                "timestamp": now_iso()
+            }, 401)
         
         response_data = {
             "success": True,
-            "count": len(mock_emails),
+            "count": len(emails),
             "query": query,
             "filters": filters,
             "user_id": user_id,
-            "user_email": token_info['user_email'],
-            "emails": mock_emails,
+            "user_email": user_email,
+            "emails": emails,
             "bearer_token_status": "valid",
-            "timestamp": datetime.now(timezone.utc).isoformat()
+            "timestamp": now_iso()
         }
         
         # Add Graph API format compatibility
-        response_data["value"] = mock_emails
-        response_data["@odata.count"] = len(mock_emails)
+        response_data["value"] = emails
+        response_data["@odata.count"] = len(emails)
         
-        return jsonify(response_data)
+        return ojsonify(response_data)
         
     except Exception as e:
-        logger.error(f"Multi-user email search error: {str(e)}")
-        logger.error(traceback.format_exc())
-        return jsonify({
+        logger.exception("Multi-user email search error: %s", e)
+        return ojsonify({
             "success": False,
             "error": "Server error",
             "details": str(e),
-            "timestamp": datetime.now(timezone.utc).isoformat()
-        }), 500
+            "timestamp": now_iso()
+        }, 500)
 
 @app.route('/api/users', methods=['GET'])
 def list_users():
     """List all registered users (for debugging)"""
     try:
-        with sqlite3.connect(DB_PATH) as conn:
-            cursor = conn.cursor()
-            cursor.execute('SELECT user_id, user_email, expires_at FROM user_tokens')
-            rows = cursor.fetchall()
-            
-            now = int(datetime.now().timestamp())
-            users = []
-            for user_id, user_email, expires_at in rows:
-                users.append({
-                    "user_id": user_id,
-                    "user_email": user_email,
-                    "token_valid": expires_at > now,
-                    "expires_at": datetime.fromtimestamp(expires_at).isoformat()
-                })
-            
-            return jsonify({
-                "users": users,
-                "count": len(users),
-                "timestamp": datetime.now(timezone.utc).isoformat()
+        with DB_LOCK:
+            rows = _get_connection().execute(
+                'SELECT user_id, user_email, expires_at FROM user_tokens'
+            ).fetchall()
+        
+        now = int(datetime.now().timestamp())
+        users = []
+        for user_id, user_email, expires_at in rows:
+            users.append({
+                "user_id": user_id,
+                "user_email": user_email,
+                "token_valid": expires_at > now,
+                "expires_at": datetime.fromtimestamp(expires_at).isoformat()
             })
-            
+        
+        return ojsonify({
+            "users": users,
+            "count": len(users),
+            "timestamp": now_iso()
+        })
+        
     except Exception as e:
-        return jsonify({
+        return ojsonify({
             "error": "Failed to list users",
             "details": str(e)
-        }), 500
+        }, 500)
 
 @app.errorhandler(404)
 def not_found(error):
-    return jsonify({
+    return ojsonify({
         "error": "Endpoint not found",
         "available_endpoints": [
             "GET /health",
             "POST /api/auth/register", 
+            "POST /api/auth/register_batch",
             "POST /api/email/search",
             "GET /api/users"
         ],
-        "timestamp": datetime.now(timezone.utc).isoformat()
-    }), 404
+        "timestamp": now_iso()
+    }, 404)
 
 if __name__ == '__main__':
     try:
@@ -300,6 +492,7 @@ if __name__ == '__main__':
         logger.info("Available endpoints:")
         logger.info("  GET  /health")
         logger.info("  POST /api/auth/register")
+        logger.info("  POST /api/auth/register_batch")
         logger.info("  POST /api/email/search")  
         logger.info("  GET  /api/users")
         
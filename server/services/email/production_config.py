@@ -6,6 +6,10 @@ Microsoft Email Authentication System
 
 import os
 import logging
+from contextlib import contextmanager
+from functools import lru_cache
+from types import MappingProxyType
+from urllib.parse import quote
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
@@ -15,9 +19,12 @@ logger = logging.getLogger(__name__)
 # PRODUCTION CONFIGURATION FOR CELESTE7.AI
 # =============================================================================
 
+# Environment snapshot taken once at import; all settings below read from it
+_ENV = dict(os.environ)
+
 # Azure AD Configuration
-TENANT_ID = os.getenv('AZURE_TENANT_ID')  # Same as development
-CLIENT_ID = os.getenv('AZURE_CLIENT_ID')  # Same as development
+TENANT_ID = _ENV.get('AZURE_TENANT_ID')  # Same as development
+CLIENT_ID = _ENV.get('AZURE_CLIENT_ID')  # Same as development
 
 # Production URLs (celeste7.ai)
 DOMAIN = "celeste7.ai"
@@ -28,100 +35,124 @@ REDIRECT_URI = f"{BASE_URL}/auth/microsoft/callback"
 
 # Microsoft Graph API Configuration
 AUTHORITY = f"https://login.microsoftonline.com/{TENANT_ID}"
-SCOPES = [
+SCOPES = (
     "Mail.Read",
     "MailboxSettings.Read", 
     "User.Read",
     "offline_access"
-]
+)
 
-# API Endpoints for CelesteOS-Modern Integration
-API_ENDPOINTS = {
+# API Endpoints for CelesteOS-Modern Integration (read-only)
+API_ENDPOINTS = MappingProxyType({
     "email_search": f"{BASE_URL}/api/email/search",
     "user_status": f"{BASE_URL}/api/email/user/{{user_id}}/status",
     "register": f"{BASE_URL}/auth/microsoft/register",
     "callback": f"{BASE_URL}/auth/microsoft/callback",
     "users": f"{BASE_URL}/api/email/users"
-}
+})
 
 # Production Database Configuration
-DATABASE_CONFIG = {
-    "type": "postgresql",  # or your preferred database
-    "host": os.getenv('DB_HOST', 'localhost'),
-    "port": os.getenv('DB_PORT', 5432),
-    "database": os.getenv('DB_NAME', 'celesteos'),
-    "username": os.getenv('DB_USER', 'celesteos'),
-    "password": os.getenv('DB_PASSWORD'),
-    "table": "user_email_tokens"
-}
+@lru_cache(maxsize=1)
+def get_database_config():
+    """Get DATABASE_CONFIG, building it on first use"""
+    return {
+        "type": "postgresql",  # or your preferred database
+        "host": _ENV.get('DB_HOST', 'localhost'),
+        "port": _ENV.get('DB_PORT', 5432),
+        "database": _ENV.get('DB_NAME', 'celesteos'),
+        "username": _ENV.get('DB_USER', 'celesteos'),
+        "password": _ENV.get('DB_PASSWORD'),
+        "table": "user_email_tokens",
+        "pool_min": int(_ENV.get('DB_POOL_MIN', 1)),
+        "pool_max": int(_ENV.get('DB_POOL_MAX', 10))
+    }
 
 # Redis Configuration (for token caching)
-REDIS_CONFIG = {
-    "host": os.getenv('REDIS_HOST', 'localhost'),
-    "port": os.getenv('REDIS_PORT', 6379),
-    "password": os.getenv('REDIS_PASSWORD'),
-    "database": 0
-}
+@lru_cache(maxsize=1)
+def get_redis_config():
+    """Get REDIS_CONFIG, building it on first use"""
+    return {
+        "host": _ENV.get('REDIS_HOST', 'localhost'),
+        "port": _ENV.get('REDIS_PORT', 6379),
+        "password": _ENV.get('REDIS_PASSWORD'),
+        "database": 0,
+        "max_connections": int(_ENV.get('REDIS_MAX_CONN', 50))
+    }
 
 # Security Settings
-SECURITY = {
-    "token_encryption_key": os.getenv('EMAIL_TOKEN_ENCRYPTION_KEY'),
-    "session_secret": os.getenv('SESSION_SECRET_KEY'),
-    "https_only": True,
-    "secure_cookies": True,
-    "csrf_protection": True
-}
+@lru_cache(maxsize=1)
+def get_security_config():
+    """Get SECURITY, building it on first use"""
+    return {
+        "token_encryption_key": _ENV.get('EMAIL_TOKEN_ENCRYPTION_KEY'),
+        "session_secret": _ENV.get('SESSION_SECRET_KEY'),
+        "https_only": True,
+        "secure_cookies": True,
+        "csrf_protection": True
+    }
 
 # CelesteOS-Modern Integration Settings
-CELESTEOS_INTEGRATION = {
-    "user_api_endpoint": f"{BASE_URL}/api/users",  # Existing CelesteOS user API
-    "chat_interface_url": f"{BASE_URL}/chatllm",
-    "return_url_after_auth": f"{BASE_URL}/chatllm?email_connected=true"
-}
+@lru_cache(maxsize=1)
+def get_celesteos_integration():
+    """Get CELESTEOS_INTEGRATION, building it on first use"""
+    return {
+        "user_api_endpoint": f"{BASE_URL}/api/users",  # Existing CelesteOS user API
+        "chat_interface_url": f"{BASE_URL}/chatllm",
+        "return_url_after_auth": f"{BASE_URL}/chatllm?email_connected=true"
+    }
 
 # Service Configuration
-SERVICES = {
-    "email_api_service": {
-        "host": "0.0.0.0",
-        "port": int(os.getenv('EMAIL_API_PORT', 8001)),
-        "workers": int(os.getenv('EMAIL_API_WORKERS', 4))
-    },
-    "auth_service": {
-        "host": "0.0.0.0", 
-        "port": int(os.getenv('AUTH_SERVICE_PORT', 8002)),
-        "workers": int(os.getenv('AUTH_SERVICE_WORKERS', 2))
-    },
-    "registration_service": {
-        "host": "0.0.0.0",
-        "port": int(os.getenv('REGISTRATION_PORT', 8003)),
-        "workers": int(os.getenv('REGISTRATION_WORKERS', 2))
+@lru_cache(maxsize=1)
+def get_services_config():
+    """Get SERVICES, building it on first use"""
+    return {
+        "email_api_service": {
+            "host": "0.0.0.0",
+            "port": int(_ENV.get('EMAIL_API_PORT', 8001)),
+            "workers": int(_ENV.get('EMAIL_API_WORKERS', 4))
+        },
+        "auth_service": {
+            "host": "0.0.0.0", 
+            "port": int(_ENV.get('AUTH_SERVICE_PORT', 8002)),
+            "workers": int(_ENV.get('AUTH_SERVICE_WORKERS', 2))
+        },
+        "registration_service": {
+            "host": "0.0.0.0",
+            "port": int(_ENV.get('REGISTRATION_PORT', 8003)),
+            "workers": int(_ENV.get('REGISTRATION_WORKERS', 2))
+        }
     }
-}
 
 # Logging Configuration
-LOGGING_CONFIG = {
-    "level": os.getenv('LOG_LEVEL', 'INFO'),
-    "format": "%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    "handlers": {
-        "file": {
-            "filename": "/var/log/celesteos/email-auth.log",
-            "max_bytes": 10485760,  # 10MB
-            "backup_count": 5
-        },
-        "syslog": {
-            "address": os.getenv('SYSLOG_ADDRESS', '/dev/log'),
-            "facility": "local0"
+@lru_cache(maxsize=1)
+def get_logging_config():
+    """Get LOGGING_CONFIG, building it on first use"""
+    return {
+        "level": _ENV.get('LOG_LEVEL', 'INFO'),
+        "format": "%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+        "handlers": {
+            "file": {
+                "filename": "/var/log/celesteos/email-auth.log",
+                "max_bytes": 10485760,  # 10MB
+                "backup_count": 5
+            },
+            "syslog": {
+                "address": _ENV.get('SYSLOG_ADDRESS', '/dev/log'),
+                "facility": "local0"
+            }
         }
     }
-}
 
 # Monitoring & Analytics
-MONITORING = {
-    "prometheus_port": int(os.getenv('PROMETHEUS_PORT', 9090)),
-    "health_check_interval": 30,
-    "alert_webhook": os.getenv('ALERT_WEBHOOK_URL'),
-    "metrics_retention_days": 30
-}
+@lru_cache(maxsize=1)
+def get_monitoring_config():
+    """Get MONITORING, building it on first use"""
+    return {
+        "prometheus_port": int(_ENV.get('PROMETHEUS_PORT', 9090)),
+        "health_check_interval": 30,
+        "alert_webhook": _ENV.get('ALERT_WEBHOOK_URL'),
+        "metrics_retention_days": 30
+    }
 
 # Rate Limiting
 RATE_LIMITING = {
@@ -130,19 +161,27 @@ RATE_LIMITING = {
     "email_searches_per_hour": 1000
 }
 
+REQUIRED_ENV_VARS = (
+    'AZURE_TENANT_ID',
+    'AZURE_CLIENT_ID', 
+    'EMAIL_TOKEN_ENCRYPTION_KEY',
+    'SESSION_SECRET_KEY'
+)
+
+def _build_validator(required_env_vars):
+    """Generate a straight-line check returning the missing variables, in order"""
+    src = "def _v(e):\n    m = []\n" + "".join(
+        f"    if not e.get({var!r}): m.append({var!r})\n" for var in required_env_vars
+    ) + "    return m\n"
+    namespace = {}
+    exec(compile(src, "<production_config validator>", "exec"), namespace)
+    return namespace['_v']
+
+_validator = _build_validator(REQUIRED_ENV_VARS)
+
 def validate_production_config():
     """Validate all required production configuration"""
-    required_env_vars = [
-        'AZURE_TENANT_ID',
-        'AZURE_CLIENT_ID', 
-        'EMAIL_TOKEN_ENCRYPTION_KEY',
-        'SESSION_SECRET_KEY'
-    ]
-    
-    missing_vars = []
-    for var in required_env_vars:
-        if not os.getenv(var):
-            missing_vars.append(var)
+    missing_vars = _validator(_ENV)
     
     if missing_vars:
         raise ValueError(f"Missing required environment variables: {', '.join(missing_vars)}")
@@ -150,19 +189,85 @@ def validate_production_config():
     logger.info("✅ Production configuration validated successfully")
     return True
 
+@lru_cache(maxsize=1)
 def get_azure_ad_config():
-    """Get Azure AD configuration for production"""
-    return {
+    """Get Azure AD configuration for production (read-only, shared between callers)"""
+    return MappingProxyType({
         "client_id": CLIENT_ID,
         "authority": AUTHORITY,
         "redirect_uri": REDIRECT_URI,
         "scopes": SCOPES
-    }
+    })
 
+@lru_cache(maxsize=1)
 def get_database_url():
     """Get database connection URL"""
-    config = DATABASE_CONFIG
-    return f"postgresql://{config['username']}:{config['password']}@{config['host']}:{config['port']}/{config['database']}"
+    config = get_database_config()
+    # Credentials are percent-encoded so characters like '@' or '/' can't break the URL
+    username = quote(config['username'], safe='')
+    password = quote(config['password'] or '', safe='')
+    return f"postgresql://{username}:{password}@{config['host']}:{config['port']}/{config['database']}"
+
+@lru_cache(maxsize=1)
+def get_db_pool():
+    """Get the process-wide PostgreSQL connection pool, creating it on first use"""
+    from psycopg2.pool import ThreadedConnectionPool  # Only needed by services using the database
+    
+    config = get_database_config()
+    return ThreadedConnectionPool(
+        minconn=config['pool_min'],
+        maxconn=config['pool_max'],
+        dsn=get_database_url()
+    )
+
+@contextmanager
+def get_conn():
+    """Borrow a connection from the pool for the duration of a with-block"""
+    pool = get_db_pool()
+    conn = pool.getconn()
+    try:
+        yield conn
+    finally:
+        pool.putconn(conn)
+
+@lru_cache(maxsize=1)
+def get_redis_pool():
+    """Get the process-wide Redis connection pool, creating it on first use"""
+    import redis  # Only needed by services using the token cache
+    
+    config = get_redis_config()
+    return redis.ConnectionPool(
+        host=config['host'],
+        port=int(config['port']),
+        password=config['password'],
+        db=config['database'],
+        max_connections=config['max_connections']
+    )
+
+def get_redis():
+    """Get a Redis client backed by the shared connection pool"""
+    import redis
+    
+    return redis.Redis(connection_pool=get_redis_pool())
+
+# Config dicts built lazily by their accessors; still importable by their old
+# names through the module __getattr__ below
+_LAZY_CONFIGS = {
+    "DATABASE_CONFIG": get_database_config,
+    "REDIS_CONFIG": get_redis_config,
+    "SECURITY": get_security_config,
+    "CELESTEOS_INTEGRATION": get_celesteos_integration,
+    "SERVICES": get_services_config,
+    "LOGGING_CONFIG": get_logging_config,
+    "MONITORING": get_monitoring_config,
+}
+
+def __getattr__(name):
+    """Resolve the lazily built config dicts by name (PEP 562)"""
+    accessor = _LAZY_CONFIGS.get(name)
+    if accessor is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return accessor()
 
 if __name__ == "__main__":
     # Test configuration
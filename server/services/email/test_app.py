@@ -6,11 +6,14 @@ Validates installation and basic functionality without GUI
 
 import sys
 import os
+import importlib
+import io
 import logging
+from contextlib import contextmanager
 from datetime import datetime
 
 # Add current directory to path for imports
-sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from _testbootstrap import bootstrap, _shared_root; bootstrap()
 
 # Configure logging
 logging.basicConfig(
@@ -19,44 +22,37 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# (module, display name, version attribute or None)
+REQUIRED_MODULES = (
+    ("msal", "MSAL", "__version__"),
+    ("requests", "Requests", "__version__"),
+    ("keyring", "Keyring", None),
+    ("dateutil.parser", "Python-dateutil", None),
+    ("tkinter", "Tkinter", "TkVersion"),
+)
+
+_TS_FMT = '%Y-%m-%d %H:%M:%S'
+
+# Report header, built once; only the start time changes between runs
+_BANNER = "\n".join(("=" * 50, "Yacht Email Reader - Installation Test", "=" * 50))
+_PLATFORM_INFO = f"Python version: {sys.version}\nOperating system: {os.name} - {sys.platform}\n"
+
 def test_imports():
     """Test that all required modules can be imported"""
     print("Testing imports...")
     
-    try:
-        import msal
-        print(f"✓ MSAL version {msal.__version__}")
-    except ImportError as e:
-        print(f"✗ MSAL import failed: {e}")
-        return False
-    
-    try:
-        import requests
-        print(f"✓ Requests version {requests.__version__}")
-    except ImportError as e:
-        print(f"✗ Requests import failed: {e}")
-        return False
-    
-    try:
-        import keyring
-        print(f"✓ Keyring available")
-    except ImportError as e:
-        print(f"✗ Keyring import failed: {e}")
-        return False
-    
-    try:
-        from dateutil import parser
-        print(f"✓ Python-dateutil available")
-    except ImportError as e:
-        print(f"✗ Python-dateutil import failed: {e}")
-        return False
-    
-    try:
-        import tkinter as tk
-        print(f"✓ Tkinter available (version {tk.TkVersion})")
-    except ImportError as e:
-        print(f"✗ Tkinter import failed: {e}")
-        return False
+    for module_name, display_name, version_attr in REQUIRED_MODULES:
+        try:
+            module = importlib.import_module(module_name)
+        except ImportError as e:
+            print(f"✗ {display_name} import failed: {e}")
+            return False
+        
+        version = getattr(module, version_attr, None) if version_attr else None
+        if version is not None:
+            print(f"✓ {display_name} version {version}")
+        else:
+            print(f"✓ {display_name} available")
     
     return True
 
@@ -222,16 +218,17 @@ def test_gui_imports():
         from gui_app import YachtEmailReaderApp
         print("✓ GUI application class imported")
         
+        if sys.platform.startswith('linux') and not os.environ.get('DISPLAY'):
+            print("- Tkinter root window skipped (no display)")
+            return True
+        
         # Test that we can create the app object (but don't run it)
         # This tests that all imports work
-        import tkinter as tk
-        root = tk.Tk()
-        root.withdraw()  # Hide the window
+        _shared_root()
         
         # We can't easily test the full GUI without running it
         # but we can test that initialization doesn't crash
         print("✓ Tkinter root window created")
-        root.destroy()
         
         return True
         
@@ -239,15 +236,35 @@ def test_gui_imports():
         print(f"✗ GUI test failed: {e}")
         return False
 
+@contextmanager
+def _buffered_stdout():
+    """Block-buffer stdout for the duration of a run instead of flushing every line"""
+    original = sys.stdout
+    if not hasattr(original, 'buffer'):
+        # stdout already replaced (e.g. captured by a harness); leave it alone
+        yield
+        return
+    
+    original.flush()
+    sys.stdout = io.TextIOWrapper(
+        original.buffer,
+        encoding=original.encoding,
+        errors=original.errors,
+        line_buffering=False,
+        write_through=False
+    )
+    try:
+        yield
+    finally:
+        sys.stdout.flush()
+        sys.stdout.detach()  # Keep the underlying buffer open for the original stream
+        sys.stdout = original
+
 def run_all_tests():
     """Run all tests and report results"""
-    print("=" * 50)
-    print("Yacht Email Reader - Installation Test")
-    print("=" * 50)
-    print(f"Test started at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-    print(f"Python version: {sys.version}")
-    print(f"Operating system: {os.name} - {sys.platform}")
-    print("")
+    print(_BANNER)
+    print(f"Test started at: {datetime.now().strftime(_TS_FMT)}")
+    print(_PLATFORM_INFO)
     
     tests = [
         ("Import Test", test_imports),
@@ -293,5 +310,6 @@ def run_all_tests():
         return False
 
 if __name__ == "__main__":
-    success = run_all_tests()
+    with _buffered_stdout():
+        success = run_all_tests()
     sys.exit(0 if success else 1)
\ No newline at end of file
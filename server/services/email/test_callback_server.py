@@ -5,14 +5,37 @@ Test the callback server to debug authentication issues
 
 import sys
 import os
-import time
 import webbrowser
+import socket
 import threading
+import time
+import urllib.request
 from http.server import HTTPServer, BaseHTTPRequestHandler
 from urllib.parse import urlparse, parse_qs
 
-# Add current directory to path
-sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+# Add current directory to path for imports
+from _testbootstrap import bootstrap; bootstrap()
+
+# Canned responses, encoded once at import
+_SUCCESS_HTML = """
+<!DOCTYPE html>
+<html>
+<head>
+    <title>TEST - Authentication Successful</title>
+    <style>
+        body { font-family: Arial, sans-serif; text-align: center; padding: 50px; }
+        .success { color: green; font-size: 24px; }
+    </style>
+</head>
+<body>
+    <h1 class="success">✅ TEST CALLBACK SUCCESSFUL!</h1>
+    <p>The callback server is working correctly.</p>
+    <p>Authorization code received and processed.</p>
+    <p>You can close this window.</p>
+</body>
+</html>
+""".encode('utf-8')
+_NO_CODE_HTML = b"<h1>No authorization code received</h1>"
 
 class TestCallbackHandler(BaseHTTPRequestHandler):
     """Test HTTP handler for OAuth callback"""
@@ -32,30 +55,7 @@ class TestCallbackHandler(BaseHTTPRequestHandler):
                 auth_code = query_components['code'][0]
                 print(f"✅ Authorization code received: {auth_code[:50]}...")
                 
-                self.send_response(200)
-                self.send_header('Content-type', 'text/html')
-                self.send_header('Connection', 'close')
-                self.end_headers()
-                
-                success_html = """
-                <!DOCTYPE html>
-                <html>
-                <head>
-                    <title>TEST - Authentication Successful</title>
-                    <style>
-                        body { font-family: Arial, sans-serif; text-align: center; padding: 50px; }
-                        .success { color: green; font-size: 24px; }
-                    </style>
-                </head>
-                <body>
-                    <h1 class="success">✅ TEST CALLBACK SUCCESSFUL!</h1>
-                    <p>The callback server is working correctly.</p>
-                    <p>Authorization code received and processed.</p>
-                    <p>You can close this window.</p>
-                </body>
-                </html>
-                """
-                self.wfile.write(success_html.encode('utf-8'))
+                self._send_html(200, _SUCCESS_HTML)
                 
                 # Mark as received
                 self.server.callback_received = True
@@ -63,22 +63,41 @@ class TestCallbackHandler(BaseHTTPRequestHandler):
                 
             else:
                 print("❌ No authorization code in callback")
-                self.send_response(400)
-                self.send_header('Content-type', 'text/html')
-                self.end_headers()
-                self.wfile.write(b"<h1>No authorization code received</h1>")
+                self._send_html(400, _NO_CODE_HTML)
                 
         except Exception as e:
             print(f"❌ Error handling callback: {str(e)}")
-            self.send_response(500)
-            self.send_header('Content-type', 'text/html')
-            self.end_headers()
-            self.wfile.write(f"<h1>Server Error: {str(e)}</h1>".encode())
+            self._send_html(500, f"<h1>Server Error: {str(e)}</h1>".encode())
+    
+    def _send_html(self, status: int, body: bytes):
+        """Send an encoded HTML page with an explicit Content-Length"""
+        self.send_response(status)
+        self.send_header('Content-type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
     
     def log_message(self, format, *args):
         """Custom logging"""
         print(f"🌐 HTTP: {format % args}")
 
+class TestCallbackServer(HTTPServer):
+    """Callback server that can rebind its port immediately"""
+    allow_reuse_address = True
+    
+    def server_bind(self):
+        if sys.platform.startswith('linux') and hasattr(socket, 'SO_REUSEPORT'):
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        super().server_bind()
+
+def _fetch(url):
+    """Request a URL and discard the response, standing in for the browser"""
+    try:
+        with urllib.request.urlopen(url, timeout=5) as response:
+            response.read()
+    except OSError as e:
+        print(f"❌ Test request failed: {str(e)}")
+
 def test_callback_server():
     """Test the callback server independently"""
     print("🧪 Testing Callback Server")
@@ -87,38 +106,46 @@ def test_callback_server():
     PORT = 8001
     
     try:
-        # Start test server
-        server = HTTPServer(('localhost', PORT), TestCallbackHandler)
+        # Start test server, falling back to any free port if ours is taken
+        try:
+            server = TestCallbackServer(('localhost', PORT), TestCallbackHandler)
+        except OSError as e:
+            print(f"⚠️  Port {PORT} unavailable ({str(e)}), using an ephemeral port")
+            server = TestCallbackServer(('localhost', 0), TestCallbackHandler)
         server.callback_received = False
         server.auth_code = None
+        port = server.server_address[1]
         
-        # Start in background thread
-        server_thread = threading.Thread(target=server.serve_forever)
-        server_thread.daemon = True
-        server_thread.start()
-        
-        print(f"✅ Test server started on http://localhost:{PORT}")
-        print(f"🔗 Test URL: http://localhost:{PORT}/?code=test123&state=teststate")
+        print(f"✅ Test server started on http://localhost:{port}")
+        print(f"🔗 Test URL: http://localhost:{port}/?code=test123&state=teststate")
         
         # Open test URL
-        test_url = f"http://localhost:{PORT}/?code=test123&state=teststate"
-        print(f"🌐 Opening test URL in browser...")
-        webbrowser.open(test_url)
+        test_url = f"http://localhost:{port}/?code=test123&state=teststate"
+        if os.environ.get('USE_BROWSER'):
+            print("🌐 Opening test URL in browser...")
+            webbrowser.open(test_url)
+        else:
+            print("🌐 Requesting test URL (set USE_BROWSER=1 to use a browser)...")
+            threading.Thread(target=_fetch, args=(test_url,), daemon=True).start()
         
-        # Wait for callback
+        # Serve requests on this thread until the callback arrives; each
+        # handle_request() blocks on the socket until a request or the timeout
         print("⏳ Waiting for callback (10 seconds)...")
-        start_time = time.time()
-        while time.time() - start_time < 10:
-            if server.callback_received:
-                print("✅ Callback received successfully!")
-                print(f"📋 Authorization code: {server.auth_code}")
+        deadline = time.monotonic() + 10
+        while not server.callback_received:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
                 break
-            time.sleep(0.1)
+            server.timeout = remaining
+            server.handle_request()
+        
+        if server.callback_received:
+            print("✅ Callback received successfully!")
+            print(f"📋 Authorization code: {server.auth_code}")
         else:
             print("❌ Callback timeout - no response received")
         
         # Cleanup
-        server.shutdown()
         server.server_close()
         print("🔧 Test server stopped")
         
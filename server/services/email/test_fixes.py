@@ -5,10 +5,27 @@ Comprehensive test to validate all code fixes
 
 import sys
 import os
+import importlib
 import logging
+import time
 
-# Add current directory to path
-sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+# Add current directory to path for imports
+from _testbootstrap import bootstrap; bootstrap()
+
+# Environment variables config.py reads at import time
+CONFIG_ENV_VARS = ('AZURE_TENANT_ID', 'AZURE_CLIENT_ID')
+_config_env = None  # Values of CONFIG_ENV_VARS when config was last (re)loaded here
+
+def reload_config_if_env_changed():
+    """Import config, reloading it only if its environment variables changed since it was loaded"""
+    global _config_env
+    env = tuple(os.environ.get(name) for name in CONFIG_ENV_VARS)
+    already_loaded = 'config' in sys.modules
+    import config
+    if already_loaded and env != _config_env:
+        importlib.reload(config)
+    _config_env = env
+    return config
 
 def test_configuration():
     """Test configuration validation"""
@@ -19,8 +36,8 @@ def test_configuration():
     os.environ.pop('AZURE_CLIENT_ID', None)
     
     try:
-        from config import validate_config
-        validate_config()
+        config = reload_config_if_env_changed()
+        config.validate_config()
         print("❌ Configuration validation should have failed")
         return False
     except ValueError as e:
@@ -31,9 +48,7 @@ def test_configuration():
     os.environ['AZURE_CLIENT_ID'] = 'a744caeb-9896-4dbf-8b85-d5e07dba935c'
     
     # Reload config module to pick up new env vars
-    import importlib
-    import config
-    importlib.reload(config)
+    config = reload_config_if_env_changed()
     
     try:
         config.validate_config()
@@ -60,7 +75,6 @@ def test_token_manager():
             return False
         
         # Test valid token (future expiration)
-        import time
         future_time = int(time.time()) + 3600
         valid_token = {'access_token': 'test', 'expires_at': future_time}
         if tm.is_token_valid(valid_token):
@@ -69,6 +83,15 @@ def test_token_manager():
             print("❌ Token validation failed to identify valid token")
             return False
         
+        # Test token past its refresh time but not yet expired
+        now = time.time()
+        refresh_due_token = {'access_token': 'test', 'expires_at': int(now) + 3600, 'refresh_at': int(now) - 60}
+        if tm.is_token_valid(refresh_due_token, now) and tm.should_refresh(refresh_due_token, now):
+            print("✅ Token past refresh_at is still valid and due for refresh")
+        else:
+            print("❌ Token past refresh_at should stay valid until it expires")
+            return False
+        
         print("✅ Token manager tests passed")
         return True
         
@@ -99,6 +122,21 @@ def test_auth_manager():
             print("❌ Auth manager should return None when not authenticated")
             return False
         
+        # Test a token past refresh_at but before expires_at is still returned
+        # when no silent refresh is possible
+        now = int(time.time())
+        refresh_due_token = {'access_token': 'refresh_due', 'expires_at': now + 3600, 'refresh_at': now - 60}
+        auth.token_manager.get_tokens = lambda: refresh_due_token
+        try:
+            token = auth.get_access_token()
+        finally:
+            del auth.token_manager.get_tokens
+        if token == 'refresh_due':
+            print("✅ Auth manager returns a token that is due for refresh but not expired")
+        else:
+            print("❌ Auth manager should keep using a token until it expires")
+            return False
+        
         print("✅ Auth manager tests passed")
         return True
         
@@ -135,6 +173,47 @@ def test_graph_client():
         print(f"❌ Graph client test failed: {str(e)}")
         return False
 
+def test_offline_cache():
+    """Test the offline email cache keeps only the latest snapshot"""
+    print("\n💾 Testing Offline Cache...")
+    
+    try:
+        import tempfile
+        from error_handler import OfflineDataManager
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = OfflineDataManager(os.path.join(tmp, "offline.db"))
+            cache.cache_emails([
+                {'id': 'a', 'receivedDateTime': '2024-01-02T10:00:00Z'},
+                {'id': 'b', 'receivedDateTime': 'not a date'},
+                {'receivedDateTime': '2024-01-03T10:00:00Z'},  # No id
+            ])
+            
+            # Id-less emails are skipped; unparseable dates are kept but sort last
+            ids = [email['id'] for email in cache.get_cached_emails()]
+            if ids == ['a', 'b']:
+                print("✅ Offline cache skips emails without an id")
+            else:
+                print(f"❌ Unexpected cached emails: {ids}")
+                return False
+            
+            # A re-sync replaces the snapshot instead of growing it
+            cache.cache_emails([{'id': 'c', 'receivedDateTime': '2024-01-04T10:00:00Z'}])
+            ids = [email['id'] for email in cache.get_cached_emails()]
+            cache._conn.close()
+            if ids == ['c']:
+                print("✅ Offline cache drops emails missing from a re-sync")
+            else:
+                print(f"❌ Stale emails kept after re-sync: {ids}")
+                return False
+        
+        print("✅ Offline cache tests passed")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Offline cache test failed: {str(e)}")
+        return False
+
 def test_gui_initialization():
     """Test GUI initialization improvements"""
     print("\n🖥️  Testing GUI Initialization...")
@@ -166,6 +245,7 @@ def main():
         test_token_manager,
         test_auth_manager,
         test_graph_client,
+        test_offline_cache,
         test_gui_initialization
     ]
     
@@ -6,9 +6,12 @@ Simple test GUI to diagnose widget display issues
 import tkinter as tk
 from tkinter import ttk
 
+from _testbootstrap import bootstrap, _shared_root; bootstrap()
+
 def test_gui():
-    # Create root window
-    root = tk.Tk()
+    # Reuse the shared root window, shown for this visual check
+    root = _shared_root()
+    root.deiconify()
     root.title("TEST - Email Reader for Microsoft Outlook")
     root.geometry("800x600")
     root.configure(bg='lightgray')
@@ -3,22 +3,80 @@ Secure token storage using macOS Keychain
 Handles access and refresh token persistence with encryption
 """
 
+import base64
 import keyring
-import json
+from keyring.errors import PasswordDeleteError
 import logging
+import threading
 import time
-from typing import Optional, Dict, Any
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Tuple
 from config import KEYCHAIN_SERVICE, APP_NAME
 
 logger = logging.getLogger(__name__)
 
+TOKEN_CACHE_SIZE = 4096  # Users whose tokens are kept in memory, least recently used evicted
+
+# Token payloads are (de)serialized with orjson when available; keyring stores str
+try:
+    import orjson
+    
+    def _dumps(obj: Any) -> str:
+        return orjson.dumps(obj).decode('utf-8')
+    
+    _loads = orjson.loads
+except ImportError:
+    import json
+    
+    _dumps = json.dumps
+    _loads = json.loads
+
+# Tokens are stored as base64 msgpack behind a version byte when msgpack is
+# installed; JSON payloads (older entries, or no msgpack) are still read
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+_MSGPACK_VERSION = b'\x01'
+
+def _encode_tokens(token_data: Dict[str, Any]) -> str:
+    """Serialize token data for the keychain"""
+    if msgpack is None:
+        return _dumps(token_data)
+    payload = _MSGPACK_VERSION + msgpack.packb(token_data, use_bin_type=True)
+    return base64.b64encode(payload).decode('ascii')
+
+def _decode_tokens(token_str: str) -> Dict[str, Any]:
+    """Deserialize token data written by _encode_tokens in either format"""
+    if token_str.startswith('{'):
+        return _loads(token_str)
+    
+    payload = base64.b64decode(token_str)
+    if payload[:1] != _MSGPACK_VERSION:
+        raise ValueError(f"Unknown token payload version: {payload[:1]!r}")
+    if msgpack is None:
+        raise ValueError("msgpack is required to read the stored tokens")
+    return msgpack.unpackb(payload[1:], raw=False)
+
 class TokenManager:
     """Manages secure storage and retrieval of OAuth tokens using macOS Keychain"""
     
+    # Parsed tokens shared by every instance in the process, keyed by
+    # (service_name, username), so valid tokens are served without keychain I/O.
+    # Kept in LRU order and bounded by TOKEN_CACHE_SIZE.
+    _cache: "OrderedDict[Tuple[str, str], Dict[str, Any]]" = OrderedDict()
+    _cache_lock = threading.Lock()
+    # Keychain reads in progress, so concurrent callers share a single read
+    _inflight: Dict[Tuple[str, str], threading.Event] = {}
+    # Time each cached token stops being valid, so has_tokens is a float compare
+    _valid_until: Dict[Tuple[str, str], float] = {}
+    
     def __init__(self, username: str = "default_user"):
         self.username = username
         self.service_name = KEYCHAIN_SERVICE
         self.cache_key = f"{username}_cache"
+        self._token_key = (self.service_name, username)
         
     def store_tokens(self, token_response: Dict[str, Any]) -> bool:
         """
@@ -45,10 +103,22 @@ class TokenManager:
                 'stored_at': current_time
             }
             
-            # Store as JSON string in keychain
-            token_json = json.dumps(token_data)
+            # Refresh proactively at the server's suggested time. MSAL strips
+            # refresh_in from its results, so fall back to its own rule: tokens
+            # living 2 hours or more are refreshed halfway through
+            refresh_in = token_response.get('refresh_in')
+            if not refresh_in and expires_in >= 7200:
+                refresh_in = expires_in // 2
+            if refresh_in:
+                token_data['refresh_in'] = refresh_in
+                token_data['refresh_at'] = current_time + refresh_in
+            
+            # Store serialized token data in keychain
+            token_json = _encode_tokens(token_data)
             keyring.set_password(self.service_name, self.username, token_json)
             
+            self._cache_tokens(token_data)
+            
             logger.info("Tokens stored successfully in macOS Keychain")
             return True
             
@@ -60,24 +130,73 @@ class TokenManager:
         """
         Retrieve tokens from macOS Keychain
         
+        Tokens still valid in the in-process cache are returned without
+        touching the keychain, and concurrent callers for the same user
+        share one keychain read.
+        
         Returns:
             Dict containing token data or None if not found
         """
+        with self._cache_lock:
+            cached = self._cache.get(self._token_key)
+            if cached is not None and self.is_token_valid(cached):
+                self._cache.move_to_end(self._token_key)
+                return cached
+            
+            fetch_done = self._inflight.get(self._token_key)
+            is_fetcher = fetch_done is None
+            if is_fetcher:
+                fetch_done = self._inflight[self._token_key] = threading.Event()
+        
+        if not is_fetcher:
+            # Another thread is already reading the keychain; use its result
+            fetch_done.wait()
+            with self._cache_lock:
+                return self._cache.get(self._token_key)
+        
+        try:
+            return self._load_tokens()
+        finally:
+            with self._cache_lock:
+                del self._inflight[self._token_key]
+            fetch_done.set()
+    
+    def _load_tokens(self) -> Optional[Dict[str, Any]]:
+        """Read tokens from macOS Keychain and update the in-process cache"""
         try:
             token_json = keyring.get_password(self.service_name, self.username)
             
             if token_json:
-                token_data = json.loads(token_json)
+                token_data = _decode_tokens(token_json)
+                self._cache_tokens(token_data)
                 logger.info("Tokens retrieved successfully from macOS Keychain")
                 return token_data
             else:
+                self._evict_tokens()
                 logger.info("No tokens found in macOS Keychain")
                 return None
                 
         except Exception as e:
+            self._evict_tokens()
             logger.error(f"Failed to retrieve tokens: {str(e)}")
             return None
     
+    def _cache_tokens(self, token_data: Dict[str, Any]):
+        """Remember tokens (and when they stop being valid) in the in-process cache"""
+        with self._cache_lock:
+            self._cache[self._token_key] = token_data
+            self._cache.move_to_end(self._token_key)
+            self._valid_until[self._token_key] = self._token_deadline(token_data)
+            while len(self._cache) > TOKEN_CACHE_SIZE:
+                evicted_key, _ = self._cache.popitem(last=False)
+                self._valid_until.pop(evicted_key, None)
+    
+    def _evict_tokens(self):
+        """Forget this user's tokens in the in-process cache"""
+        with self._cache_lock:
+            self._cache.pop(self._token_key, None)
+            self._valid_until.pop(self._token_key, None)
+    
     def clear_tokens(self) -> bool:
         """
         Remove stored tokens from macOS Keychain
@@ -85,23 +204,25 @@ class TokenManager:
         Returns:
             bool: True if deletion successful, False otherwise
         """
+        self._evict_tokens()
+        
         try:
             # Clear both tokens and cache
             success = True
             try:
                 keyring.delete_password(self.service_name, self.username)
-            except keyring.errors.PasswordDeleteError:
+            except PasswordDeleteError:
                 pass  # Already deleted
             
             try:
                 keyring.delete_password(self.service_name, self.cache_key)
-            except keyring.errors.PasswordDeleteError:
+            except PasswordDeleteError:
                 pass  # Already deleted
                 
             logger.info("Tokens and cache cleared from macOS Keychain")
             return True
             
-        except keyring.errors.PasswordDeleteError:
+        except PasswordDeleteError:
             logger.info("No tokens found to delete")
             return True
             
@@ -116,15 +237,21 @@ class TokenManager:
         Returns:
             bool: True if valid tokens exist, False otherwise
         """
+        now = time.time()
+        valid_until = self._valid_until.get(self._token_key)
+        if valid_until is not None and valid_until > now:
+            return True
+        
         tokens = self.get_tokens()
-        return tokens is not None and self.is_token_valid(tokens)
+        return tokens is not None and self.is_token_valid(tokens, now)
     
-    def is_token_valid(self, token_data: Dict[str, Any]) -> bool:
+    def is_token_valid(self, token_data: Dict[str, Any], now: Optional[float] = None) -> bool:
         """
         Check if token is still valid (not expired)
         
         Args:
             token_data: Token data dictionary
+            now: Current time.time() if the caller already has it
             
         Returns:
             bool: True if token is valid, False otherwise
@@ -132,10 +259,35 @@ class TokenManager:
         if not token_data or 'expires_at' not in token_data:
             return False
         
+        if now is None:
+            now = time.time()
+        
+        return self._token_deadline(token_data) > now
+    
+    def should_refresh(self, token_data: Dict[str, Any], now: Optional[float] = None) -> bool:
+        """
+        Check if token should be refreshed, even though it may still be valid
+        
+        Args:
+            token_data: Token data dictionary
+            now: Current time.time() if the caller already has it
+            
+        Returns:
+            bool: True once refresh_at has passed or the token is no longer valid
+        """
+        if now is None:
+            now = time.time()
+        
+        refresh_at = token_data.get('refresh_at') if token_data else None
+        if refresh_at is not None and refresh_at <= now:
+            return True
+        return not self.is_token_valid(token_data, now)
+    
+    @staticmethod
+    def _token_deadline(token_data: Dict[str, Any]) -> float:
+        """Time after which tokens count as invalid"""
         # Add 5 minute buffer for token expiration
-        current_time = int(time.time())
-        expires_at = token_data.get('expires_at', 0)
-        return (expires_at - 300) > current_time
+        return token_data.get('expires_at', 0) - 300
     
     def store_cache(self, cache_data: str) -> bool:
         """
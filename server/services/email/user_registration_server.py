@@ -6,22 +6,27 @@ Handles new user email account connections
 
 import os
 import sys
-from flask import Flask, request, render_template_string, redirect, jsonify
+from flask import Flask, request, redirect, jsonify
 from flask_cors import CORS
 import logging
+from collections import OrderedDict
 from datetime import datetime, timezone
 import uuid
 import webbrowser
 import threading
 import time
 
-# Add current directory to path for imports
-sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+# Add current directory to path for imports, unless it is already there
+# (run as a script, or by gunicorn from this directory)
+_DIR = os.path.dirname(os.path.abspath(__file__))
+if _DIR not in sys.path:
+    sys.path.append(_DIR)
 
 from auth_manager import AuthManager
-from token_manager import TokenManager
 from config import validate_config
+from api_utils import now_iso, ojsonify
 import requests
+from requests.adapters import HTTPAdapter
 
 # Setup logging
 logging.basicConfig(
@@ -34,8 +39,63 @@ logger = logging.getLogger(__name__)
 app = Flask(__name__)
 CORS(app)
 
-# Store pending registrations
-pending_registrations = {}
+# Keep-alive connections to the API server, shared by all request threads
+_http = requests.Session()
+_http.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=32))
+
+# Store pending registrations, oldest first, dropping them after an hour
+REGISTRATION_TTL = 3600  # seconds
+MAX_PENDING_REGISTRATIONS = 10000
+pending_registrations = OrderedDict()  # registration_id -> (created_at, registration)
+_registrations_lock = threading.Lock()
+
+def _prune_registrations(now: float):
+    """Drop expired registrations; the caller must hold _registrations_lock"""
+    while pending_registrations:
+        created_at, _ = next(iter(pending_registrations.values()))
+        if now - created_at < REGISTRATION_TTL:
+            break
+        pending_registrations.popitem(last=False)
+
+# AuthManagers reused across /auth/start calls so each user's MSAL cache stays warm
+AUTH_POOL_SIZE = 512
+AUTH_POOL_TTL = 600  # seconds before a pooled AuthManager is rebuilt
+_auth_pool = OrderedDict()  # user_id -> (created_at, AuthManager), LRU order
+_auth_pool_lock = threading.Lock()
+
+def get_auth_manager(user_id: str) -> AuthManager:
+    """Get the pooled AuthManager for a user, creating it if missing or expired"""
+    now = time.monotonic()
+    with _auth_pool_lock:
+        entry = _auth_pool.get(user_id)
+        if entry is not None and now - entry[0] < AUTH_POOL_TTL:
+            _auth_pool.move_to_end(user_id)
+            return entry[1]
+    
+    auth_manager = AuthManager(user_id)
+    with _auth_pool_lock:
+        _auth_pool[user_id] = (now, auth_manager)
+        _auth_pool.move_to_end(user_id)
+        while len(_auth_pool) > AUTH_POOL_SIZE:
+            _auth_pool.popitem(last=False)
+    return auth_manager
+
+# Users with a login in flight; AuthManager.login() keeps per-login state, so
+# a user's pooled manager must not run two logins at once
+_logins_in_progress = set()
+
+def _begin_login(user_id: str) -> bool:
+    """Claim the login slot for a user; False if a login is already running"""
+    with _auth_pool_lock:
+        if user_id in _logins_in_progress:
+            return False
+        _logins_in_progress.add(user_id)
+        return True
+
+def _end_login(user_id: str):
+    """Release the login slot claimed by _begin_login"""
+    with _auth_pool_lock:
+        _logins_in_progress.discard(user_id)
 
 # HTML Templates
 REGISTRATION_PAGE = """
@@ -123,6 +183,10 @@ SUCCESS_PAGE = """
 </html>
 """
 
+# Templates are compiled once here rather than on every render
+_REGISTRATION_TEMPLATE = app.jinja_env.from_string(REGISTRATION_PAGE)
+_SUCCESS_TEMPLATE = app.jinja_env.from_string(SUCCESS_PAGE)
+
 @app.route('/register')
 def register_user():
     """Show registration page for new user"""
@@ -132,14 +196,20 @@ def register_user():
     
     # Store the registration request
     registration_id = str(uuid.uuid4())
-    pending_registrations[registration_id] = {
+    registration = {
         "user_id": user_id,
         "timestamp": datetime.now(timezone.utc).isoformat(),
         "status": "pending"
     }
+    now = time.monotonic()
+    with _registrations_lock:
+        _prune_registrations(now)
+        pending_registrations[registration_id] = (now, registration)
+        if len(pending_registrations) > MAX_PENDING_REGISTRATIONS:
+            pending_registrations.popitem(last=False)
     
     logger.info(f"New registration request for user_id: {user_id}")
-    return render_template_string(REGISTRATION_PAGE, user_id=user_id)
+    return _REGISTRATION_TEMPLATE.render(user_id=user_id)
 
 @app.route('/auth/start')
 def start_auth():
@@ -148,17 +218,19 @@ def start_auth():
     if not user_id:
         return jsonify({"error": "Missing user_id parameter"}), 400
     
+    if not _begin_login(user_id):
+        return jsonify({"error": "Authentication already in progress for this user"}), 409
+    
     try:
-        # Create a user-specific AuthManager
-        token_manager = TokenManager(username=user_id)
-        auth_manager = AuthManager(token_manager=token_manager)
+        # Reuse this user's AuthManager (and its MSAL cache) when we have one
+        auth_manager = get_auth_manager(user_id)
         
         # Start authentication process
         result = auth_manager.login()
         
         if result and result.get("access_token"):
             # Registration successful - register with API server
-            registration_success = requests.post(
+            registration_success = _http.post(
                 "http://localhost:8001/api/auth/register",
                 json={
                     "user_id": user_id,
@@ -167,12 +239,13 @@ def start_auth():
                     "refresh_token": result.get("refresh_token", ""),
                     "expires_in": result.get("expires_in", 3600)
                 },
-                headers={"Content-Type": "application/json"}
+                headers={"Content-Type": "application/json"},
+                timeout=(1.0, 5.0)
             )
             
             if registration_success.status_code == 200:
                 logger.info(f"User {user_id} successfully registered")
-                return render_template_string(SUCCESS_PAGE)
+                return _SUCCESS_TEMPLATE.render()
             else:
                 logger.error(f"Failed to register user {user_id}: {registration_success.text}")
                 return jsonify({"error": "Registration failed"}), 500
@@ -183,26 +256,64 @@ def start_auth():
     except Exception as e:
         logger.error(f"Error during authentication for user {user_id}: {str(e)}")
         return jsonify({"error": "Authentication process failed"}), 500
+    finally:
+        _end_login(user_id)
 
 @app.route('/health')
 def health():
     """Health check endpoint"""
-    return jsonify({
+    with _registrations_lock:
+        _prune_registrations(time.monotonic())
+        pending_count = len(pending_registrations)
+    
+    return ojsonify({
         "status": "healthy",
         "service": "User Registration Server",
-        "timestamp": datetime.now(timezone.utc).isoformat(),
-        "pending_registrations": len(pending_registrations)
+        "timestamp": now_iso(),
+        "pending_registrations": pending_count
     })
 
 @app.route('/api/registrations')
 def list_registrations():
     """List all pending/completed registrations"""
-    return jsonify({
-        "registrations": list(pending_registrations.values()),
-        "count": len(pending_registrations),
-        "timestamp": datetime.now(timezone.utc).isoformat()
+    with _registrations_lock:
+        _prune_registrations(time.monotonic())
+        registrations = [registration for _, registration in pending_registrations.values()]
+    
+    return ojsonify({
+        "registrations": registrations,
+        "count": len(registrations),
+        "timestamp": now_iso()
     })
 
+def run_server(host: str = '0.0.0.0', port: int = 8003):
+    """
+    Serve the app under gunicorn with threaded workers
+    
+    A single worker process keeps pending registrations and pooled
+    AuthManagers in one place; its threads handle requests concurrently so a
+    slow Microsoft sign-in doesn't block other callers.
+    """
+    from gunicorn.app.base import BaseApplication  # Only needed when run as a server
+    
+    options = {
+        "bind": f"{host}:{port}",
+        "worker_class": "gthread",
+        "workers": 1,
+        "threads": 8,
+        "keepalive": 5,
+    }
+    
+    class RegistrationServer(BaseApplication):
+        def load_config(self):
+            for key, value in options.items():
+                self.cfg.set(key, value)
+        
+        def load(self):
+            return app
+    
+    RegistrationServer().run()
+
 if __name__ == "__main__":
     try:
         validate_config()
@@ -214,7 +325,7 @@ if __name__ == "__main__":
         logger.info("  GET  /api/registrations")
         
         # Run on a different port to avoid conflicts
-        app.run(host='0.0.0.0', port=8003, debug=False)
+        run_server(host='0.0.0.0', port=8003)
         
     except Exception as e:
         logger.error(f"Failed to start server: {str(e)}")